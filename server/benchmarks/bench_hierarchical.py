@@ -0,0 +1,101 @@
+"""
+Benchmark time to a finished script for flat vs hierarchical outlines.
+
+LLM calls are replaced by sleeps proportional to their expected output tokens,
+so the numbers show how the scheduling scales with `word_count`, not real model
+latency. Flat mode makes one outline call whose output grows with the number of
+sections, then drafts every section in order. Hierarchical mode drafts a chapter
+list, expands chapters in parallel and drafts chapters concurrently.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_hierarchical --word-counts 7000 14000 28000 56000
+"""
+import argparse
+import time
+
+from models.content import (
+    GenerateOutlineInput, GenerateCompleteScriptInput, Outline, OutlineSection,
+    Chapter, GenerateOutlineSectionContentOutput
+)
+from service.content import ContentService, SECTIONS_PER_CHAPTER, CHAPTER_CONCURRENCY
+
+SECTION_TOKENS = 1000
+OUTLINE_TOKENS_PER_SECTION = 80
+CHAPTER_TOKENS = 60
+
+
+def simulate(tokens: int, seconds_per_token: float) -> None:
+    time.sleep(tokens * seconds_per_token)
+
+
+def make_section(position: int, chapter=None) -> OutlineSection:
+    return OutlineSection(
+        id=str(position), position=position, title=f"Section {position}",
+        description="description", instructions="instructions", chapter=chapter
+    )
+
+
+def install_fakes(seconds_per_token: float) -> None:
+    def draft_chapters(input, chapters_count):
+        simulate(chapters_count * CHAPTER_TOKENS, seconds_per_token)
+        return [Chapter(position=i, title=f"Chapter {i}", description="description") for i in range(chapters_count)]
+
+    def expand_chapter(input, chapters, index, sections_count):
+        simulate(sections_count * OUTLINE_TOKENS_PER_SECTION, seconds_per_token)
+        return [make_section(i) for i in range(sections_count)]
+
+    def generate_section(input, persist=True):
+        simulate(SECTION_TOKENS, seconds_per_token)
+        return GenerateOutlineSectionContentOutput(content="content")
+
+    ContentService._draft_chapters = staticmethod(draft_chapters)
+    ContentService._expand_chapter = staticmethod(expand_chapter)
+    ContentService.generate_outline_section_content = staticmethod(generate_section)
+
+
+def complete_input(outline: Outline) -> GenerateCompleteScriptInput:
+    return GenerateCompleteScriptInput(
+        outline=outline, script_title="Benchmark", context="",
+        n_person_view="third", excluded_words="", model="gpt-4o-mini"
+    )
+
+
+def run_flat(word_count: int, seconds_per_token: float) -> float:
+    start = time.perf_counter()
+    sections_count = max(1, int(word_count / 700))
+    simulate(sections_count * OUTLINE_TOKENS_PER_SECTION, seconds_per_token)
+    outline = Outline(id=None, sections=[make_section(i) for i in range(sections_count)])
+    ContentService.generate_remaining_sections(complete_input(outline), start_index=0)
+    return time.perf_counter() - start
+
+
+def run_hierarchical(word_count: int) -> float:
+    start = time.perf_counter()
+    outline = ContentService.generate_outline_draft(GenerateOutlineInput(
+        script_title="Benchmark", word_count=word_count, language="English", audience="General",
+        style="Informative", tone="Neutral", model="gpt-4o-mini", additional_data="", hierarchical=True
+    ))
+    # Saved sections get IDs
+    outline.sections = [section.model_copy(update={"id": str(section.position)}) for section in outline.sections]
+    ContentService.generate_remaining_sections(complete_input(outline), start_index=0)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--word-counts", type=int, nargs="+", default=[7000, 14000, 28000, 56000])
+    parser.add_argument("--seconds-per-token", type=float, default=0.0001,
+                        help="Simulated generation time per output token")
+    args = parser.parse_args()
+
+    install_fakes(args.seconds_per_token)
+    print(f"sections/chapter={SECTIONS_PER_CHAPTER} chapter concurrency={CHAPTER_CONCURRENCY}")
+    print(f"{'words':>7} {'sections':>9} {'flat s':>8} {'hier s':>8} {'speedup':>8}")
+    for word_count in args.word_counts:
+        flat = run_flat(word_count, args.seconds_per_token)
+        hierarchical = run_hierarchical(word_count)
+        print(f"{word_count:>7} {max(1, int(word_count / 700)):>9} {flat:>8.2f} {hierarchical:>8.2f} {flat / hierarchical:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
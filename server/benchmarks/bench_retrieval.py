@@ -0,0 +1,77 @@
+"""
+Benchmark the additional_data retrieval index.
+
+For synthetic research documents of increasing size, reports index build time,
+serialized index size, load time from the stored form, query latency, and the
+number of words a section prompt receives. The last column should stay flat
+however large the document gets.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_retrieval --sizes 1000 10000 100000 --queries 200
+"""
+import argparse
+import json
+import random
+import time
+
+from service.retrieval import BM25Index, RETRIEVAL_TOP_K
+
+TOPICS = [
+    "diagnostic imaging", "patient privacy", "hospital staffing", "drug discovery", "clinical trials",
+    "insurance coverage", "medical devices", "genomics", "telemedicine", "surgical robotics",
+]
+FILLER = (
+    "researchers reported results across several sites while regulators reviewed the evidence "
+    "and clinicians compared outcomes against historical baselines over multiple years"
+).split()
+
+
+def make_document(words: int, rng: random.Random) -> str:
+    paragraphs, total = [], 0
+    while total < words:
+        topic = rng.choice(TOPICS)
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            body = " ".join(rng.choice(FILLER) for _ in range(rng.randint(10, 25)))
+            sentences.append(f"In {topic}, {body}.")
+        paragraph = " ".join(sentences)
+        total += len(paragraph.split())
+        paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 500000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'words':>8} {'chunks':>7} {'build ms':>9} {'stored KiB':>11} {'load ms':>8} {'query ms':>9} {'prompt words':>13}")
+    for size in args.sizes:
+        document = make_document(size, rng)
+
+        start = time.perf_counter()
+        index = BM25Index.build(document)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        stored = json.dumps(index.to_dict())
+        start = time.perf_counter()
+        BM25Index.from_dict(json.loads(stored))
+        load_ms = (time.perf_counter() - start) * 1000
+
+        queries = [f"{rng.choice(TOPICS)} section about {rng.choice(TOPICS)}" for _ in range(args.queries)]
+        start = time.perf_counter()
+        for query in queries:
+            passages = index.search(query, k=RETRIEVAL_TOP_K)
+        query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        prompt_words = sum(len(passage.split()) for passage in passages)
+
+        print(
+            f"{size:>8} {len(index.chunks):>7} {build_ms:>9.1f} {len(stored) / 1024:>11.1f} "
+            f"{load_ms:>8.1f} {query_ms:>9.3f} {prompt_words:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
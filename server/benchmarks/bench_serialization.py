@@ -0,0 +1,100 @@
+"""
+Benchmark CPU time per request for section-heavy responses.
+
+Compares the default path (build WrittenOutlineSection models in the handler,
+then validate and serialize them again through response_model) with the
+FAST_RESPONSES path (orjson straight from repository rows), and reports the
+cost and payload size of gzip compression on top.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_serialization --sections 40 --requests 200
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from models.content import WrittenOutlineSection
+
+PARAGRAPH = (
+    "AI has transformed healthcare in ways we couldn't have imagined a decade ago. "
+    "In hospitals across the country, machine learning algorithms now analyze medical "
+    "images with remarkable accuracy, flagging subtle patterns for further review. "
+)
+
+
+def make_rows(sections: int, words_per_section: int) -> List[dict]:
+    """Build rows shaped like the outline_sections table."""
+    rng = random.Random(0)
+    vocabulary = PARAGRAPH.split()
+    # Shuffled words so gzip ratios resemble prose rather than a repeated string
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{index:012d}",
+            "title": f"Section {index}",
+            "description": "Overview of how AI is currently being used in healthcare settings",
+            "instructions": "Start with concrete examples of AI applications in hospitals and clinics.",
+            "content": " ".join(rng.choice(vocabulary) for _ in range(words_per_section)),
+        }
+        for index in range(sections)
+    ]
+
+
+def default_path(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    sections = [WrittenOutlineSection(
+        id=row["id"],
+        title=row["title"],
+        description=row["description"],
+        instructions=row["instructions"],
+        content=row["content"]
+    ) for row in rows]
+    validated = adapter.validate_python(sections, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def fast_path(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    return orjson.dumps(rows)
+
+
+def measure(fn, rows, adapter, requests: int) -> tuple:
+    body = fn(rows, adapter)
+    start = time.process_time()
+    for _ in range(requests):
+        fn(rows, adapter)
+    return (time.process_time() - start) / requests * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--words", type=int, default=700)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    args = parser.parse_args()
+
+    rows = make_rows(args.sections, args.words)
+    adapter = TypeAdapter(List[WrittenOutlineSection])
+
+    results = {}
+    for name, fn in (("default", default_path), ("fast", fast_path)):
+        cpu_ms, body = measure(fn, rows, adapter, args.requests)
+        start = time.process_time()
+        for _ in range(args.requests):
+            compressed = gzip.compress(body, compresslevel=args.gzip_level)
+        gzip_ms = (time.process_time() - start) / args.requests * 1000
+        results[name] = cpu_ms
+        print(
+            f"{name:>8}: {cpu_ms:7.3f} ms CPU/request serialize, "
+            f"{gzip_ms:7.3f} ms gzip, {len(body) / 1024:8.1f} KiB -> {len(compressed) / 1024:7.1f} KiB"
+        )
+
+    print(f"speedup: {results['default'] / results['fast']:.1f}x ({args.sections} sections x ~{args.words} words)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measure API cold start with `python -X importtime` and check it against a budget.
+
+Each run starts a fresh interpreter that imports `main` and runs the app's
+lifespan startup, so the measured wall time is the time until a worker could
+accept requests. The slowest imports are reported from `-X importtime`.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 1500
+    python -m benchmarks.bench_startup --record benchmarks/startup_history.jsonl
+
+With --record, one JSON line tagged with the current git commit is appended
+to the given file so time-to-ready can be tracked per commit. The script exits
+with status 1 when the median time-to-ready exceeds the budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READY_SNIPPET = """
+import asyncio
+import main
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(startup())
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Return cumulative import time in microseconds per top-level import line."""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative_us)
+    return timings
+
+
+def run_once() -> tuple:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", READY_SNIPPET],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+    )
+    ready_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr[-2000:]}")
+    return ready_ms, parse_importtime(result.stderr)
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show")
+    parser.add_argument("--record", help="Append a JSON result line to this file")
+    args = parser.parse_args()
+
+    ready_times, import_times, timings = [], [], {}
+    for _ in range(args.runs):
+        ready_ms, timings = run_once()
+        ready_times.append(ready_ms)
+        import_times.append(timings.get("main", 0) / 1000)
+
+    ready_median = statistics.median(ready_times)
+    import_median = statistics.median(import_times)
+    slowest = sorted(
+        ((name, us) for name, us in timings.items() if "." not in name and name != "main"),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:args.top]
+
+    print(f"import main:   {import_median:8.1f} ms (median of {args.runs})")
+    print(f"time-to-ready: {ready_median:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports (last run):")
+    for name, us in slowest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if args.record:
+        with open(args.record, "a") as history:
+            history.write(json.dumps({
+                "commit": current_commit(),
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "import_ms": round(import_median, 1),
+                "ready_ms": round(ready_median, 1),
+                "budget_ms": args.budget_ms,
+                "slowest_imports": {name: round(us / 1000, 1) for name, us in slowest},
+            }) + "\n")
+
+    if ready_median > args.budget_ms:
+        print(f"FAIL: time-to-ready exceeds budget by {ready_median - args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+-- Serialized BM25 index of outlines.additional_data, see service/retrieval.py.
+-- Optional: without the column, outlines are indexed in process when first used.
+alter table outlines add column if not exists additional_data_index jsonb;
@@ -0,0 +1,3 @@
+-- Chapter index of sections in hierarchical outlines, see ContentService.generate_outline_draft.
+-- Required when FAST_RESPONSES is enabled, since GET /outline/{id} selects the column by name.
+alter table outline_sections add column if not exists chapter integer;
@@ -1,7 +1,21 @@
-from supabase import create_client, Client
 import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()
 
-supabase: Client = create_client(supabase_url=os.getenv("NEXT_PUBLIC_SUPABASE_URL"), supabase_key=os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY"))
+
+@lru_cache(maxsize=1)
+def get_supabase() -> "Client":
+    """
+    Return the shared Supabase client, creating it on first use.
+
+    The supabase package and its HTTP client are only imported here so that
+    importing the app stays cheap and does not fail when env vars are missing.
+    """
+    from supabase import create_client
+    return create_client(supabase_url=os.getenv("NEXT_PUBLIC_SUPABASE_URL"), supabase_key=os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY"))
@@ -1,9 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routes.content import router as content_router
+from routes.metrics import router as metrics_router
+from middleware.profiling import ProfilingMiddleware, PROFILING_ENABLED
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+import logging
+import os
 
+try:
+    # Optional: pip install brotli-asgi to serve Brotli to clients that accept it
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
-app = FastAPI()
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "6"))
+
+# Connect to Supabase and import LangChain during startup instead of on the first request
+WARM_ON_STARTUP = os.getenv("WARM_ON_STARTUP", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_ON_STARTUP:
+        from db.supabase import get_supabase
+        import langchain_openai  # noqa: F401
+        import langchain_core.prompts  # noqa: F401
+
+        get_supabase()
+        logger.info("Warmed Supabase client and LangChain imports")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,5 +46,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
+# Only installed when configured, so unprofiled deployments pay nothing
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 
-app.include_router(content_router)
\ No newline at end of file
+app.include_router(content_router)
+app.include_router(metrics_router)
\ No newline at end of file
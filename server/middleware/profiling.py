@@ -0,0 +1,235 @@
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Requests carrying this value in the X-Profile-Token header are profiled
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+# Fraction of all requests profiled without the header, e.g. 0.01
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(100 * 1024 * 1024)))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+# Sample every thread in the process, not just the ones working on the profiled request
+PROFILE_ALL_THREADS = os.getenv("PROFILE_ALL_THREADS", "false").lower() == "true"
+
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+class ProfileSession:
+    """The threads currently working on behalf of one profiled request, and the outline it concerns."""
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.outline_id: Optional[str] = None
+        self._workers: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def enter(self, thread_id: Optional[int] = None) -> None:
+        thread_id = thread_id or threading.get_ident()
+        with self._lock:
+            self._workers[thread_id] = self._workers.get(thread_id, 0) + 1
+
+    def exit(self, thread_id: Optional[int] = None) -> None:
+        thread_id = thread_id or threading.get_ident()
+        with self._lock:
+            self._workers[thread_id] -= 1
+            if not self._workers[thread_id]:
+                del self._workers[thread_id]
+
+    def thread_ids(self) -> set:
+        with self._lock:
+            return {self.thread_id, *self._workers}
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def tag_outline(outline_id: Optional[str]) -> None:
+    """Record the outline the current request works on, for routes without it in the path."""
+    session = _current_session.get()
+    if session is not None and outline_id:
+        session.outline_id = outline_id
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Wrap `fn` before handing it to a worker thread so that, when the current request is
+    being profiled, the thread is sampled for as long as it runs `fn`.
+
+    Returns `fn` unchanged when no profile is active.
+    """
+    session = _current_session.get()
+    if session is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _current_session.set(session)
+        session.enter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.exit()
+            _current_session.reset(token)
+
+    return run
+
+
+@contextmanager
+def profiled_thread(thread_id: Optional[int]):
+    """
+    Sample another thread with the current request's profile while the block runs.
+
+    Meant for shared threads such as the model router's event loop, whose samples
+    can then include work done for other requests at the same time.
+    """
+    session = _current_session.get()
+    if session is None or thread_id is None:
+        yield
+        return
+    session.enter(thread_id)
+    try:
+        yield
+    finally:
+        session.exit(thread_id)
+
+
+class StackSampler(threading.Thread):
+    """Samples Python stacks at a fixed interval and counts them in folded (collapsed) form."""
+
+    def __init__(
+        self,
+        session: ProfileSession,
+        interval: float = PROFILE_INTERVAL_SECONDS,
+        all_threads: bool = PROFILE_ALL_THREADS,
+    ):
+        super().__init__(name="profiler", daemon=True)
+        self.counts: Counter = Counter()
+        self._session = session
+        self._interval = interval
+        self._all_threads = all_threads
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            frames = sys._current_frames()
+            thread_ids = frames.keys() if self._all_threads else self._session.thread_ids()
+            names = None
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == self.ident:
+                    continue
+                if thread_id == self._session.thread_id:
+                    self.counts[self._fold(frame)] += 1
+                    continue
+                # Worker threads are labelled by name so their stacks stay apart from the handler's
+                if names is None:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.counts[self._fold(frame, names.get(thread_id, str(thread_id)))] += 1
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self.join()
+        return self.counts
+
+    @staticmethod
+    def _fold(frame, root: Optional[str] = None) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if root:
+            stack.append(root)
+        return ";".join(reversed(stack))
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", value).strip("_") or "root"
+
+
+def _rotate(directory: str, max_bytes: int) -> None:
+    """Delete the oldest profiles until the directory fits in `max_bytes`."""
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".folded")]
+    paths.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(path) for path in paths)
+    for path in paths:
+        if total <= max_bytes:
+            break
+        total -= os.path.getsize(path)
+        os.remove(path)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests with a sampling profiler.
+
+    A request is profiled when it carries the admin token in X-Profile-Token or
+    is picked by PROFILE_SAMPLE_RATE. Stacks of the thread serving the request,
+    and of the worker threads started for it through `profiled`, are written in
+    folded format (flamegraph.pl, speedscope, inferno) to PROFILE_DIR, tagged
+    with the route and outline ID. Because handlers run on the event loop
+    thread, samples can include other requests served concurrently.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        if PROFILE_ADMIN_TOKEN:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile-token":
+                    return hmac.compare_digest(value.decode("latin-1"), PROFILE_ADMIN_TOKEN)
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}_{random.getrandbits(32):08x}"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        session = ProfileSession(threading.get_ident())
+        token = _current_session.set(session)
+        sampler = StackSampler(session)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _current_session.reset(token)
+            counts = sampler.stop()
+            self._write_profile(scope, session, profile_id, counts, time.perf_counter() - start)
+
+    def _write_profile(self, scope, session: ProfileSession, profile_id: str, counts: Counter, elapsed: float) -> None:
+        try:
+            route = scope.get("route")
+            route_path = getattr(route, "path", scope.get("path", ""))
+            outline_id = session.outline_id or scope.get("path_params", {}).get("outline_id", "-")
+            name = f"{profile_id}_{scope.get('method', '')}_{_slug(route_path)}_{_slug(outline_id)}.folded"
+
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, name), "w") as profile:
+                for stack, count in counts.most_common():
+                    profile.write(f"{stack} {count}\n")
+            _rotate(PROFILE_DIR, PROFILE_MAX_BYTES)
+            logger.info(f"Wrote profile {name} ({sum(counts.values())} samples, {elapsed:.2f}s)")
+        except Exception as e:
+            logger.error(f"Error writing profile: {str(e)}")
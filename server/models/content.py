@@ -16,6 +16,24 @@ class OutlineSection(BaseModel):
     title: str
     description: str
     instructions: str
+    chapter: Optional[int] = None
+
+
+class Chapter(BaseModel):
+    """Model representing a chapter of a hierarchical outline."""
+    position: int
+    title: str
+    description: str
+
+
+class ChapterOutline(BaseModel):
+    """Model representing the chapter list of a hierarchical outline."""
+    chapters: List[Chapter]
+
+
+class ChapterSections(BaseModel):
+    """Model representing the sections drafted for one chapter."""
+    sections: List[OutlineSection]
 
 
 class Outline(BaseModel):
@@ -39,6 +57,7 @@ class GenerateOutlineInput(BaseModel):
     tone: str
     model: str
     additional_data: str
+    hierarchical: bool = False
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -85,6 +104,11 @@ class GenerateOutlineSectionContentOutput(BaseModel):
 class GenerateCompleteScriptInput(BaseModel):
     """Input model for generating a complete script from an outline."""
     outline: Outline
+    script_title: str
+    context: str
+    n_person_view: str
+    excluded_words: str
+    model: str
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -102,6 +126,22 @@ class WrittenOutlineSection(BaseModel):
     content: str
 
 
+class RegenerateSectionInput(BaseModel):
+    """Input model for regenerating a single section of a stored outline."""
+    n_person_view: str
+    excluded_words: str = ""
+    model: Optional[str] = None
+    cascade: bool = False
+    max_cascade: Optional[int] = None
+
+
+class RegenerateSectionOutput(BaseModel):
+    """Output model for single-section regeneration."""
+    section: WrittenOutlineSection
+    regenerated_section_ids: List[str]
+    stale_section_ids: List[str]
+
+
 class GenerateCompleteScriptOutput(BaseModel):
     """Output model for complete script generation."""
     sections: List[WrittenOutlineSection]
@@ -124,6 +164,9 @@ class SaveOutlineInput(BaseModel):
     model: str
     additional_data: str
     sections: List[OutlineSection]
+    n_person_view: Optional[str] = None
+    excluded_words: Optional[str] = None
+    speculate: Optional[bool] = None
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -132,6 +175,16 @@ class SaveOutlineInput(BaseModel):
     )
 
 
+class OutlineUpdateResponse(BaseModel):
+    """Response model for diff-based outline updates."""
+    outline_id: str
+    rows_written: int
+    sections_created: List[str]
+    sections_updated: List[str]
+    sections_invalidated: List[str]
+    sections_deleted: List[str]
+
+
 class OutlineResponse(BaseModel):
     """Response model for outline operations."""
     outline_id: str
@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+
+
+class SpeculationStats(BaseModel):
+    """Counters for speculative first-section generation."""
+    started: int
+    in_flight: int
+    hits: int
+    misses: int
+    wasted: int
+    failed: int
+    hit_ratio: float
+    waste_ratio: float
+    avg_seconds_saved: float
+
+
+class ModelLatencyStats(BaseModel):
+    """Rolling latency and reliability counters for one model on one task."""
+    task: str
+    model: str
+    samples: int
+    p50_seconds: float
+    p95_seconds: float
+    calls: int
+    errors: int
+    timeouts: int
+    hedges: int
+    hedge_wins: int
+    fallbacks: int
+
+
+class AdmissionStats(BaseModel):
+    """Queue depth and load shedding counters for generation requests."""
+    queued_jobs: int
+    queued_sections: int
+    queued_tokens: int
+    estimated_backlog_seconds: float
+    slo_seconds: float
+    admitted: int
+    shed: int
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class StoryEntity(BaseModel):
+    """Model representing a character, place or object tracked across sections."""
+    name: str = Field(description="Canonical name, reused exactly when the entity appears again")
+    kind: str = Field(description="One of: character, place, object, organization")
+    description: str = Field(description="One sentence describing the entity as of this section")
+
+
+class StoryEvent(BaseModel):
+    """Model representing a plot event that happened in a section."""
+    summary: str = Field(description="One sentence summary of the event")
+    participants: List[str] = Field(default_factory=list, description="Names of the entities involved")
+
+
+class SectionStoryState(BaseModel):
+    """Entities and events introduced or changed by a single section."""
+    entities: List[StoryEntity]
+    events: List[StoryEvent]
+
+
+class TrackedEntity(StoryEntity):
+    """Story entity with the range of section positions it appears in."""
+    first_position: int
+    last_position: int
+
+
+class TrackedEvent(StoryEvent):
+    """Story event with the position of the section it happened in."""
+    position: int
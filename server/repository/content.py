@@ -1,10 +1,15 @@
-from db.supabase import supabase
+from db.supabase import get_supabase
 from typing import List, Dict, Any, Optional
 from models.content import OutlineSection, Outline
 from datetime import datetime
 
 class ContentRepository:
-    """Repository for interacting with content-related database tables."""
+    """
+    Repository for interacting with content-related database tables.
+    
+    Columns added after the initial schema are created by the SQL files in
+    db/migrations and are only written when they hold a value.
+    """
     
     @staticmethod
     def create_outline(outline_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -17,18 +22,19 @@ class ContentRepository:
         Returns:
             The stored outline data with generated ID
         """
-        response = supabase.table("outlines").insert(outline_data).execute()
+        response = get_supabase().table("outlines").insert(outline_data).execute()
         if not response.data:
             raise ValueError("Failed to create outline in database")
         return response.data[0]
 
     @staticmethod
-    def get_outline(outline_id: str) -> Dict[str, Any]:
+    def get_outline(outline_id: str, columns: str = "*") -> Dict[str, Any]:
         """
         Get outline by ID.
         
         Args:
             outline_id: The ID of the outline to retrieve
+            columns: Comma-separated list of columns to select
             
         Returns:
             The outline data
@@ -36,11 +42,28 @@ class ContentRepository:
         Raises:
             ValueError: If outline not found
         """
-        response = supabase.table("outlines").select("*").eq("id", outline_id).execute()
+        response = get_supabase().table("outlines").select(columns).eq("id", outline_id).execute()
         if not response.data:
             raise ValueError(f"Outline with ID {outline_id} not found")
         return response.data[0]
 
+    @staticmethod
+    def update_outline(outline_id: str, outline_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Update stored parameters of an outline.
+        
+        Args:
+            outline_id: The ID of the outline to update
+            outline_data: Dictionary containing the columns to change
+            
+        Returns:
+            The updated outline data
+        """
+        response = get_supabase().table("outlines").update(outline_data).eq("id", outline_id).execute()
+        if not response.data:
+            raise ValueError(f"Failed to update outline {outline_id}")
+        return response.data[0]
+
     @staticmethod
     def create_outline_sections(outline_sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -55,11 +78,43 @@ class ContentRepository:
         if not outline_sections:
             return []
             
-        response = supabase.table("outline_sections").insert(outline_sections).execute()
+        response = get_supabase().table("outline_sections").insert(outline_sections).execute()
         if not response.data:
             raise ValueError("Failed to create outline sections in database")
         return response.data
 
+    @staticmethod
+    def upsert_outline_sections(outline_sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Update multiple existing outline sections in a single request.
+        
+        Args:
+            outline_sections: List of section data dictionaries, each including its ID
+            
+        Returns:
+            The stored sections data
+        """
+        if not outline_sections:
+            return []
+            
+        response = get_supabase().table("outline_sections").upsert(outline_sections).execute()
+        if not response.data:
+            raise ValueError("Failed to update outline sections in database")
+        return response.data
+
+    @staticmethod
+    def delete_outline_sections(section_ids: List[str]) -> None:
+        """
+        Delete multiple outline sections.
+        
+        Args:
+            section_ids: The IDs of the sections to delete
+        """
+        if not section_ids:
+            return
+            
+        get_supabase().table("outline_sections").delete().in_("id", section_ids).execute()
+
     @staticmethod
     def update_section_content(section_id: str, content: str) -> Dict[str, Any]:
         """
@@ -72,23 +127,24 @@ class ContentRepository:
         Returns:
             The updated section data
         """
-        response = supabase.table("outline_sections").update({"content": content, "updated_at": "now()"}).eq("id", section_id).execute()
+        response = get_supabase().table("outline_sections").update({"content": content, "updated_at": "now()"}).eq("id", section_id).execute()
         if not response.data:
             raise ValueError(f"Failed to update content for section {section_id}")
         return response.data[0]
 
     @staticmethod
-    def get_outline_sections(outline_id: str) -> List[Dict[str, Any]]:
+    def get_outline_sections(outline_id: str, columns: str = "*") -> List[Dict[str, Any]]:
         """
         Get all sections for a specific outline.
         
         Args:
             outline_id: The ID of the outline
+            columns: Comma-separated list of columns to select
             
         Returns:
             List of section data dictionaries
         """
-        response = supabase.table("outline_sections").select("*").eq("outline_id", outline_id).order("position").execute()
+        response = get_supabase().table("outline_sections").select(columns).eq("outline_id", outline_id).order("position").execute()
         return response.data or []
 
     @staticmethod
@@ -102,5 +158,5 @@ class ContentRepository:
         Returns:
             The section data or None if not found
         """
-        response = supabase.table("outline_sections").select("*").eq("id", section_id).execute()
+        response = get_supabase().table("outline_sections").select("*").eq("id", section_id).execute()
         return response.data[0] if response.data else None
@@ -1,19 +1,41 @@
-from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks, Header, Response
+from typing import List, Optional
 from models.content import (
     GenerateOutlineInput, GenerateCompleteScriptInput, Outline, 
     OutlineSection, SaveOutlineInput, OutlineResponse, 
     GenerateCompleteScriptOutput, WrittenOutlineSection,
-    GenerateOutlineSectionContentInput
+    GenerateOutlineSectionContentInput, RegenerateSectionInput, RegenerateSectionOutput,
+    OutlineUpdateResponse
 )
 from repository.content import ContentRepository
 from service.content import ContentService
+from service.idempotency import IdempotencyConflictError
+from service.admission import AdmissionRejectedError
 import logging
+import orjson
+import os
 
 logger = logging.getLogger(__name__)
 
+# When enabled, read-only endpoints serialize repository rows directly with orjson
+# instead of building Pydantic models and validating them again via response_model.
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() == "true"
+
+# chapter is added by db/migrations/002_outline_sections_chapter.sql
+OUTLINE_SECTION_COLUMNS = "id,outline_id,position,title,description,instructions,chapter"
+WRITTEN_SECTION_COLUMNS = "id,title,description,instructions,content"
+
 router = APIRouter(prefix="/outline", tags=["Outline"])
 
+
+def _too_many_requests(error: AdmissionRejectedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 @router.post("/generate", response_model=Outline, status_code=status.HTTP_200_OK)
 async def generate_outline(request: GenerateOutlineInput):
     """
@@ -25,6 +47,8 @@ async def generate_outline(request: GenerateOutlineInput):
     try:
         outline = ContentService.generate_outline_draft(request)
         return outline
+    except AdmissionRejectedError as e:
+        raise _too_many_requests(e)
     except Exception as e:
         logger.error(f"Error generating outline: {str(e)}")
         raise HTTPException(
@@ -33,16 +57,22 @@ async def generate_outline(request: GenerateOutlineInput):
         )
 
 @router.post("/save", response_model=OutlineResponse, status_code=status.HTTP_201_CREATED)
-async def save_outline(request: SaveOutlineInput):
+async def save_outline(
+    request: SaveOutlineInput,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Save a user-edited outline to the database.
     
     This endpoint stores the outline parameters and sections after user edits.
-    Returns the ID of the saved outline for future reference.
+    Returns the ID of the saved outline for future reference. Retries sent with
+    the same Idempotency-Key header return the original outline ID.
     """
     try:
-        outline_id = ContentService.save_outline(request)
+        outline_id = ContentService.save_outline(request, idempotency_key=idempotency_key)
         return OutlineResponse(outline_id=outline_id)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         logger.error(f"Error saving outline: {str(e)}")
         raise HTTPException(
@@ -58,6 +88,11 @@ async def get_outline(outline_id: str):
     This endpoint retrieves a previously saved outline with all its sections.
     """
     try:
+        if FAST_RESPONSES:
+            ContentRepository.get_outline(outline_id, columns="id")
+            sections_data = ContentRepository.get_outline_sections(outline_id, columns=OUTLINE_SECTION_COLUMNS)
+            return Response(orjson.dumps({"id": outline_id, "sections": sections_data}), media_type="application/json")
+
         # Get the outline data
         outline_data = ContentRepository.get_outline(outline_id)
         
@@ -84,10 +119,35 @@ async def get_outline(outline_id: str):
             detail=f"Failed to retrieve outline: {str(e)}"
         )
 
+@router.put("/{outline_id}", response_model=OutlineUpdateResponse, status_code=status.HTTP_200_OK)
+async def update_outline(outline_id: str, request: SaveOutlineInput):
+    """
+    Update a stored outline in place.
+    
+    Sections are diffed against the stored ones by ID and position, and only
+    changed rows are written. Generated content is cleared only for sections
+    whose title, description or instructions changed.
+    """
+    try:
+        return ContentService.update_outline(outline_id, request)
+    except ValueError as e:
+        logger.error(f"Outline not found: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Outline not found: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"Error updating outline: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update outline: {str(e)}"
+        )
+
 @router.post("/complete", response_model=WrittenOutlineSection, status_code=status.HTTP_202_ACCEPTED)
 async def generate_complete_script(
     background_tasks: BackgroundTasks,
-    request: GenerateCompleteScriptInput
+    request: GenerateCompleteScriptInput,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Start generating a complete script from a stored outline.
@@ -95,13 +155,20 @@ async def generate_complete_script(
     This endpoint returns the first section immediately and continues 
     generating the remaining sections in the background. It's identical to
     the incremental endpoint but maintained for backward compatibility.
+    Both endpoints share one generation job per outline, so posting the same
+    outline to either of them again returns the existing job's first section.
     """
     try:
         first_section = ContentService.generate_complete_script_incremental(
             background_tasks=background_tasks,
-            input=request
+            input=request,
+            idempotency_key=idempotency_key
         )
         return first_section
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except AdmissionRejectedError as e:
+        raise _too_many_requests(e)
     except Exception as e:
         logger.error(f"Error starting script generation: {str(e)}")
         raise HTTPException(
@@ -112,7 +179,8 @@ async def generate_complete_script(
 @router.post("/complete/incremental", response_model=WrittenOutlineSection, status_code=status.HTTP_202_ACCEPTED)
 async def generate_complete_script_incremental(
     background_tasks: BackgroundTasks,
-    request: GenerateCompleteScriptInput
+    request: GenerateCompleteScriptInput,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Start generating a complete script from a stored outline.
@@ -123,9 +191,14 @@ async def generate_complete_script_incremental(
     try:
         first_section = ContentService.generate_complete_script_incremental(
             background_tasks=background_tasks,
-            input=request
+            input=request,
+            idempotency_key=idempotency_key
         )
         return first_section
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except AdmissionRejectedError as e:
+        raise _too_many_requests(e)
     except Exception as e:
         logger.error(f"Error starting script generation: {str(e)}")
         raise HTTPException(
@@ -141,6 +214,10 @@ async def get_outline_sections(outline_id: str):
     This endpoint can be used to check the progress of background generation.
     """
     try:
+        if FAST_RESPONSES:
+            sections_data = ContentRepository.get_outline_sections(outline_id, columns=WRITTEN_SECTION_COLUMNS)
+            return Response(orjson.dumps(sections_data), media_type="application/json")
+
         # Get all sections for this outline
         sections_data = ContentRepository.get_outline_sections(outline_id)
         
@@ -159,4 +236,30 @@ async def get_outline_sections(outline_id: str):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve outline sections: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/{outline_id}/sections/{section_id}/regenerate", response_model=RegenerateSectionOutput, status_code=status.HTTP_200_OK)
+async def regenerate_section(outline_id: str, section_id: str, request: RegenerateSectionInput):
+    """
+    Regenerate the content of a single section.
+    
+    Only the requested section is rewritten. The following section is reported as
+    stale if its prompt saw the changed text, and is regenerated as well when
+    cascade is enabled, up to max_cascade sections downstream.
+    """
+    try:
+        return ContentService.regenerate_section(outline_id, section_id, request)
+    except AdmissionRejectedError as e:
+        raise _too_many_requests(e)
+    except ValueError as e:
+        logger.error(f"Section not found: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Section not found: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"Error regenerating section: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to regenerate section: {str(e)}"
+        )
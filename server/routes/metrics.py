@@ -0,0 +1,32 @@
+from fastapi import APIRouter, status
+from typing import List
+from models.metrics import SpeculationStats, ModelLatencyStats, AdmissionStats
+from service.speculation import get_speculation_manager
+from service.model_router import get_model_router
+from service.admission import get_admission_controller
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/speculation", response_model=SpeculationStats, status_code=status.HTTP_200_OK)
+async def get_speculation_stats():
+    """
+    Get hit and waste counters for speculative first-section generation.
+    
+    A hit is a completion request served from a speculation; waste is a
+    speculation discarded because the outline changed or was never completed.
+    """
+    return get_speculation_manager().stats()
+
+@router.get("/models", response_model=List[ModelLatencyStats], status_code=status.HTTP_200_OK)
+async def get_model_stats():
+    """
+    Get rolling latency percentiles, hedging and fallback counters per task and model.
+    """
+    return get_model_router().stats()
+
+@router.get("/admission", response_model=AdmissionStats, status_code=status.HTTP_200_OK)
+async def get_admission_stats():
+    """
+    Get the estimated LLM backlog, queue depth and number of shed requests.
+    """
+    return get_admission_controller().stats()
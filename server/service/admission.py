@@ -0,0 +1,173 @@
+import logging
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Tuple
+from models.metrics import AdmissionStats
+from service.model_router import get_model_router
+
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+# Requests are shed once the estimated wait for their first result exceeds this
+ADMISSION_SLO_SECONDS = float(os.getenv("ADMISSION_SLO_SECONDS", "90"))
+# Number of LLM calls the upstream rate limits let run at the same time
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "8"))
+EXPECTED_SECTION_TOKENS = int(os.getenv("EXPECTED_SECTION_TOKENS", "1000"))
+EXPECTED_OUTLINE_TOKENS = int(os.getenv("EXPECTED_OUTLINE_TOKENS", "800"))
+# Generation speed assumed for a task and model until the router has measured their latency
+DEFAULT_TOKENS_PER_SECOND = float(os.getenv("DEFAULT_TOKENS_PER_SECOND", "50"))
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a generation request is shed because the backlog would exceed the latency SLO."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server is at capacity, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Pending work of one admitted request, released as its sections finish."""
+
+    def __init__(self, controller: "AdmissionController", task: str, model: str, calls: int, tokens_per_call: int):
+        self._controller = controller
+        self.task = task
+        self.model = model
+        self.calls = calls
+        self.tokens_per_call = tokens_per_call
+
+    def release(self, calls: int = 1) -> None:
+        """Mark `calls` LLM calls of this request as done."""
+        self._controller._release(self, min(calls, self.calls))
+
+    def close(self) -> None:
+        """Release whatever work is still pending, e.g. after an error."""
+        self._controller._release(self, self.calls)
+
+    def __enter__(self) -> "AdmissionTicket":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AdmissionController:
+    """
+    Admits generation requests while the estimated LLM backlog fits the latency SLO.
+
+    Pending work is tracked as LLM calls per task and model. Its drain time is
+    estimated from the model router's median latency for that same task and model,
+    or from the expected tokens at DEFAULT_TOKENS_PER_SECOND before any such call
+    completed.
+    """
+
+    def __init__(self, slo_seconds: float = ADMISSION_SLO_SECONDS, concurrency: int = UPSTREAM_CONCURRENCY):
+        self._slo_seconds = slo_seconds
+        self._concurrency = max(1, concurrency)
+        self._pending_calls: Dict[Tuple[str, str], int] = {}
+        self._pending_tokens: Dict[Tuple[str, str], int] = {}
+        self._jobs = 0
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed = 0
+
+    def _pending_seconds(self, task: str, model: str, calls: int, tokens: int) -> float:
+        latency = get_model_router().expected_latency(task, model)
+        if latency:
+            return calls * latency
+        return tokens / DEFAULT_TOKENS_PER_SECOND
+
+    def _backlog_seconds(self) -> float:
+        seconds = sum(
+            self._pending_seconds(task, model, calls, self._pending_tokens.get((task, model), 0))
+            for (task, model), calls in self._pending_calls.items()
+        )
+        return seconds / self._concurrency
+
+    def admit(
+        self,
+        model: str,
+        calls: int = 1,
+        tokens_per_call: int = EXPECTED_SECTION_TOKENS,
+        task: str = "section",
+    ) -> AdmissionTicket:
+        """
+        Admit a request or shed it.
+
+        Args:
+            model: The model requested by the caller
+            calls: Number of LLM calls the request will make
+            tokens_per_call: Expected output tokens per call
+            task: Name of the task, used to resolve the model policy and its latency
+
+        Returns:
+            A ticket to release as the calls complete
+
+        Raises:
+            AdmissionRejectedError: If the request's first result would miss the SLO
+        """
+        model = get_model_router().model_for(task, model)
+        ticket = AdmissionTicket(self, task, model, calls, tokens_per_call)
+        if not ADMISSION_CONTROL_ENABLED:
+            return ticket
+
+        with self._lock:
+            backlog = self._backlog_seconds()
+            # The caller waits for the queue ahead of it plus its own first call
+            predicted = backlog + self._pending_seconds(task, model, 1, tokens_per_call)
+            if predicted > self._slo_seconds and self._jobs > 0:
+                self.shed += 1
+                retry_after = max(1, math.ceil(predicted - self._slo_seconds))
+                logger.warning(f"Shedding request for {model}: predicted wait {predicted:.1f}s, retry after {retry_after}s")
+                raise AdmissionRejectedError(retry_after)
+
+            key = (task, model)
+            self._pending_calls[key] = self._pending_calls.get(key, 0) + calls
+            self._pending_tokens[key] = self._pending_tokens.get(key, 0) + calls * tokens_per_call
+            self._jobs += 1
+            self.admitted += 1
+        return ticket
+
+    def has_capacity(self) -> bool:
+        """Whether optional work such as speculation should run right now."""
+        with self._lock:
+            return not ADMISSION_CONTROL_ENABLED or self._backlog_seconds() < self._slo_seconds / 2
+
+    def _release(self, ticket: AdmissionTicket, calls: int) -> None:
+        if calls <= 0:
+            return
+        with self._lock:
+            ticket.calls -= calls
+            if not ADMISSION_CONTROL_ENABLED:
+                return
+            key = (ticket.task, ticket.model)
+            pending_calls = self._pending_calls.get(key, 0) - calls
+            if pending_calls > 0:
+                self._pending_calls[key] = pending_calls
+                self._pending_tokens[key] = max(0, self._pending_tokens.get(key, 0) - calls * ticket.tokens_per_call)
+            else:
+                self._pending_calls.pop(key, None)
+                self._pending_tokens.pop(key, None)
+            if ticket.calls == 0:
+                self._jobs = max(0, self._jobs - 1)
+
+    def stats(self) -> AdmissionStats:
+        with self._lock:
+            return AdmissionStats(
+                queued_jobs=self._jobs,
+                queued_sections=sum(self._pending_calls.values()),
+                queued_tokens=sum(self._pending_tokens.values()),
+                estimated_backlog_seconds=self._backlog_seconds(),
+                slo_seconds=self._slo_seconds,
+                admitted=self.admitted,
+                shed=self.shed,
+            )
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller() -> AdmissionController:
+    """Return the shared admission controller."""
+    return AdmissionController()
@@ -1,17 +1,46 @@
 import logging
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+import os
+from concurrent.futures import ThreadPoolExecutor
 from models.content import (
     GenerateOutlineInput, Outline, OutlineSection, SaveOutlineInput,
     GenerateOutlineSectionContentInput, GenerateOutlineSectionContentOutput,
-    GenerateCompleteScriptInput, GenerateCompleteScriptOutput, WrittenOutlineSection
+    GenerateCompleteScriptInput, GenerateCompleteScriptOutput, WrittenOutlineSection,
+    RegenerateSectionInput, RegenerateSectionOutput, OutlineUpdateResponse,
+    ChapterOutline, ChapterSections
 )
 from repository.content import ContentRepository
+from middleware.profiling import profiled, tag_outline
+from service.llm import structured_model, prompt_template
+from service.model_router import get_model_router
+from service.story_state import get_story_state
+from service.retrieval import RetrievalService, RETRIEVAL_OUTLINE_TOP_K
+from service.speculation import (
+    get_speculation_manager, SPECULATIVE_FIRST_SECTION, SPECULATION_DEFAULT_N_PERSON_VIEW
+)
+from service.idempotency import get_idempotency_store, request_fingerprint, COMPLETION_DEDUP_TTL_SECONDS
+from service.admission import get_admission_controller, AdmissionTicket, EXPECTED_OUTLINE_TOKENS
+from service.generation import get_outline_generations
 from fastapi import BackgroundTasks
+from typing import Optional
 
 
 logger = logging.getLogger(__name__)
 
+# How much of the previous section's content is shown to the next section's prompt
+PREVIOUS_CONTENT_CHARS = 1000
+
+# Target number of sections per chapter in hierarchical outlines
+SECTIONS_PER_CHAPTER = int(os.getenv("SECTIONS_PER_CHAPTER", "6"))
+# Chapters expanded or drafted at the same time
+CHAPTER_CONCURRENCY = int(os.getenv("CHAPTER_CONCURRENCY", "6"))
+
+
+def previous_content_window(content: str) -> str:
+    """The part of a section's content that the following section's prompt sees."""
+    if len(content) > PREVIOUS_CONTENT_CHARS:
+        return content[:PREVIOUS_CONTENT_CHARS] + "..."
+    return content
+
 
 class ContentService:
     """Service for handling content generation and management."""
@@ -28,10 +57,12 @@ class ContentService:
             A complete outline with sections
         """
         try:
-            model = ChatOpenAI(model=input.model, temperature=0.0).with_structured_output(Outline)
             sections_count = max(1, int(input.word_count / 700))  # Ensure at least 1 section
 
-            prompt = ChatPromptTemplate.from_messages(
+            if input.hierarchical:
+                return ContentService._generate_hierarchical_outline(input, sections_count)
+
+            prompt = prompt_template(
                 [
                     ("user", """
                     Generate an outline for a script with the following title: "${script_title}".
@@ -52,34 +83,184 @@ class ContentService:
                 ]
             )
 
-            chain = {
-                "context": lambda x: input.additional_data,
-                "script_title": lambda x: input.script_title,
-                "audience": lambda x: input.audience,
-                "sections_count": lambda x: sections_count,
-            } | prompt | model
+            # Long additional data is reduced to the passages most relevant to the script
+            context = RetrievalService.get_context(
+                query=f"{input.script_title} {input.audience}",
+                text=input.additional_data,
+                k=RETRIEVAL_OUTLINE_TOP_K,
+            )
+
+            def build_chain(model_name: str):
+                return {
+                    "context": lambda x: context,
+                    "script_title": lambda x: input.script_title,
+                    "audience": lambda x: input.audience,
+                    "sections_count": lambda x: sections_count,
+                } | prompt | structured_model(model_name, Outline)
 
             # Get the outline from the LLM and return it directly
-            outline = chain.invoke({})
+            with get_admission_controller().admit(input.model, tokens_per_call=EXPECTED_OUTLINE_TOKENS, task="outline"):
+                outline = get_model_router().invoke("outline", input.model, build_chain)
             return outline
         except Exception as e:
             logger.error(f"Error generating outline draft: {str(e)}")
             raise
     
     @staticmethod
-    def save_outline(input: SaveOutlineInput) -> str:
+    def _generate_hierarchical_outline(input: GenerateOutlineInput, sections_count: int) -> Outline:
+        """
+        Generate a two-level outline: a chapter list first, then each chapter's sections in parallel.
+        
+        Args:
+            input: The input parameters for outline generation
+            sections_count: Total number of sections to spread across the chapters
+            
+        Returns:
+            A flat outline whose sections carry their chapter index
+            
+        Raises:
+            ValueError: If the model returns no chapters
+        """
+        chapters_count = max(1, round(sections_count / SECTIONS_PER_CHAPTER))
+        
+        with get_admission_controller().admit(
+            input.model, calls=1 + chapters_count, tokens_per_call=EXPECTED_OUTLINE_TOKENS, task="outline"
+        ) as ticket:
+            chapters = sorted(ContentService._draft_chapters(input, chapters_count), key=lambda c: c.position)
+            ticket.release()
+            if not chapters:
+                raise ValueError(f"No chapters were generated for \"{input.script_title}\"")
+            chapters = chapters[:chapters_count]
+            
+            base, extra = divmod(sections_count, len(chapters))
+            counts = [max(1, base + (1 if index < extra else 0)) for index in range(len(chapters))]
+            
+            with ThreadPoolExecutor(max_workers=CHAPTER_CONCURRENCY, thread_name_prefix="chapter") as pool:
+                expanded = list(pool.map(
+                    profiled(lambda index: ContentService._expand_chapter(input, chapters, index, counts[index])),
+                    range(len(chapters))
+                ))
+        
+        sections = []
+        for chapter_index, chapter_sections in enumerate(expanded):
+            for section in sorted(chapter_sections, key=lambda s: s.position):
+                sections.append(section.model_copy(update={"position": len(sections), "chapter": chapter_index}))
+        return Outline(id=None, sections=sections)
+    
+    @staticmethod
+    def _draft_chapters(input: GenerateOutlineInput, chapters_count: int) -> list:
+        """Generate the chapter list of a hierarchical outline."""
+        prompt = prompt_template(
+            [
+                ("user", """
+                Generate the chapters for a long-form script with the following title: "{script_title}".
+                The script should be aimed at {audience}.
+                
+                The script should have {chapters_count} chapters, each with the following shape:
+                {{
+                   "position": "Chapter Position (0, 1, 2 etc.)",
+                   "title": "Chapter Title",
+                   "description": "Concise description of what the chapter should cover"
+                 }}
+
+
+                ***ADDITIONAL CONTEXT:***
+                {context}
+                """),
+            ]
+        )
+        
+        context = RetrievalService.get_context(
+            query=f"{input.script_title} {input.audience}",
+            text=input.additional_data,
+            k=RETRIEVAL_OUTLINE_TOP_K,
+        )
+        
+        def build_chain(model_name: str):
+            return {
+                "context": lambda x: context,
+                "script_title": lambda x: input.script_title,
+                "audience": lambda x: input.audience,
+                "chapters_count": lambda x: chapters_count,
+            } | prompt | structured_model(model_name, ChapterOutline)
+        
+        return get_model_router().invoke("outline", input.model, build_chain).chapters
+    
+    @staticmethod
+    def _expand_chapter(input: GenerateOutlineInput, chapters: list, index: int, sections_count: int) -> list:
+        """Generate the sections of one chapter of a hierarchical outline."""
+        chapter = chapters[index]
+        prompt = prompt_template(
+            [
+                ("user", """
+                Generate the sections for one chapter of a script with the following title: "{script_title}".
+                The script should be aimed at {audience}.
+                
+                Current Chapter: {chapter}
+                Previous Chapter: {previous_chapter}
+                Next Chapter: {next_chapter}
+                
+                The chapter should have {sections_count} sections, each with the following shape:
+                {{
+                   "position": "Section Position within the chapter (0, 1, 2 etc.)",
+                   "title": "Section Title",
+                   "description": "Concise description of what the section should be about",
+                   "instructions": "Concise instructions on how to write the section, the style, the tone, the audience, etc."
+                 }}
+                
+                Do not repeat material that belongs to the previous or next chapter.
+
+
+                ***ADDITIONAL CONTEXT:***
+                {context}
+                """),
+            ]
+        )
+        
+        # Each chapter gets the passages most relevant to its own topic
+        context = RetrievalService.get_context(
+            query=f"{chapter.title} {chapter.description}",
+            text=input.additional_data,
+            k=RETRIEVAL_OUTLINE_TOP_K,
+        )
+        
+        def build_chain(model_name: str):
+            return {
+                "context": lambda x: context,
+                "script_title": lambda x: input.script_title,
+                "audience": lambda x: input.audience,
+                "chapter": lambda x: chapter.model_dump(),
+                "previous_chapter": lambda x: chapters[index - 1].model_dump() if index > 0 else None,
+                "next_chapter": lambda x: chapters[index + 1].model_dump() if index < len(chapters) - 1 else None,
+                "sections_count": lambda x: sections_count,
+            } | prompt | structured_model(model_name, ChapterSections)
+        
+        return get_model_router().invoke("outline", input.model, build_chain).sections
+    
+    @staticmethod
+    def save_outline(input: SaveOutlineInput, idempotency_key: Optional[str] = None) -> str:
         """
         Save a user-edited outline to the database.
         
         Args:
             input: The outline data to save
+            idempotency_key: Client-supplied key; repeated saves with it return the first outline ID
             
         Returns:
             The ID of the saved outline
         """
+        if idempotency_key:
+            outline_id = get_idempotency_store().run(
+                f"save:{idempotency_key}",
+                request_fingerprint(input),
+                lambda: ContentService.save_outline(input),
+            )
+            tag_outline(outline_id)
+            return outline_id
+        
         try:
             # Store the outline parameters in the database
-            stored_outline = ContentRepository.create_outline({
+            outline_data = {
                 "script_title": input.script_title,
                 "word_count": input.word_count,
                 "language": input.language,
@@ -87,13 +268,22 @@ class ContentService:
                 "style": input.style,
                 "tone": input.tone,
                 "model": input.model,
-                "additional_data": input.additional_data
-            })
+                "additional_data": input.additional_data,
+            }
+            # Only written when there is one, so databases without the column keep working
+            additional_data_index = RetrievalService.build_index(input.additional_data)
+            if additional_data_index is not None:
+                outline_data["additional_data_index"] = additional_data_index
+            stored_outline = ContentRepository.create_outline(outline_data)
             
             # Get the outline ID from the stored outline
             outline_id = stored_outline["id"]
+            tag_outline(outline_id)
+            RetrievalService.cache_for_outline(outline_id, input.additional_data)
             
             # Prepare sections for storage with the outline_id
+            # Chapters are only written for hierarchical outlines, so databases without the column keep working
+            has_chapters = any(section.chapter is not None for section in input.sections)
             outline_sections = []
             for section in input.sections:
                 section_data = {
@@ -104,10 +294,17 @@ class ContentService:
                     "instructions": section.instructions,
                     "content": ""  # Initialize with empty content
                 }
+                if has_chapters:
+                    section_data["chapter"] = section.chapter
                 outline_sections.append(section_data)
             
             # Store all sections in the database
-            ContentRepository.create_outline_sections(outline_sections)
+            stored_sections = ContentRepository.create_outline_sections(outline_sections)
+            
+            # Start writing the first section before the client asks for it
+            speculate = SPECULATIVE_FIRST_SECTION if input.speculate is None else input.speculate
+            if speculate and stored_sections and get_admission_controller().has_capacity():
+                ContentService.speculate_first_section(input, stored_sections)
             
             # Return the outline ID
             return outline_id
@@ -116,12 +313,217 @@ class ContentService:
             raise
     
     @staticmethod
-    def generate_outline_section_content(input: GenerateOutlineSectionContentInput) -> GenerateOutlineSectionContentOutput:
+    def update_outline(outline_id: str, input: SaveOutlineInput) -> OutlineUpdateResponse:
+        """
+        Update a stored outline in place, writing only what changed.
+        
+        Incoming sections are matched to stored ones by ID, then by position. Only
+        changed rows are written. Generated content is kept unless the section's
+        title, description or instructions changed.
+        
+        Args:
+            outline_id: The ID of the outline to update
+            input: The edited outline
+            
+        Returns:
+            The rows written and the IDs of created, updated, invalidated and deleted sections
+            
+        Raises:
+            ValueError: If the outline is not found
+        """
+        try:
+            stored_outline = ContentRepository.get_outline(outline_id)
+            stored_sections = ContentRepository.get_outline_sections(outline_id)
+            rows_written = 0
+            
+            # Outline parameters
+            outline_data = {
+                "script_title": input.script_title,
+                "word_count": input.word_count,
+                "language": input.language,
+                "audience": input.audience,
+                "style": input.style,
+                "tone": input.tone,
+                "model": input.model,
+                "additional_data": input.additional_data
+            }
+            changed_outline_data = {
+                key: value for key, value in outline_data.items() if stored_outline.get(key) != value
+            }
+            if "additional_data" in changed_outline_data:
+                additional_data_index = RetrievalService.build_index(input.additional_data)
+                # Clear a stored index the new text no longer needs; skip the column when it was never set
+                if additional_data_index is not None or stored_outline.get("additional_data_index") is not None:
+                    changed_outline_data["additional_data_index"] = additional_data_index
+            if changed_outline_data:
+                ContentRepository.update_outline(outline_id, changed_outline_data)
+                rows_written += 1
+            
+            # Match incoming sections to stored ones by ID, then by position
+            stored_by_id = {section["id"]: section for section in stored_sections}
+            matches = {}
+            for index, section in enumerate(input.sections):
+                if section.id and section.id in stored_by_id:
+                    matches[index] = stored_by_id.pop(section.id)
+            stored_by_position = {section["position"]: section for section in stored_by_id.values()}
+            for index, section in enumerate(input.sections):
+                if index not in matches and section.position in stored_by_position:
+                    matches[index] = stored_by_position.pop(section.position)
+            matched_ids = {section["id"] for section in matches.values()}
+            
+            # Every row of a bulk write needs the same keys, so chapter is written on all of them or none
+            has_chapters = any(section.chapter is not None for section in input.sections) or any(
+                section.get("chapter") is not None for section in stored_sections
+            )
+            
+            updated_rows = []
+            new_rows = []
+            invalidated = []
+            invalidated_positions = []
+            moved_from_positions = []
+            for index, section in enumerate(input.sections):
+                row = {
+                    "outline_id": outline_id,
+                    "position": section.position,
+                    "title": section.title,
+                    "description": section.description,
+                    "instructions": section.instructions,
+                }
+                if has_chapters:
+                    row["chapter"] = section.chapter
+                stored = matches.get(index)
+                if stored is None:
+                    new_rows.append({**row, "content": ""})
+                    continue
+                
+                brief_changed = any(stored[key] != row[key] for key in ("title", "description", "instructions"))
+                if not brief_changed and stored["position"] == section.position and stored.get("chapter") == section.chapter:
+                    continue
+                
+                if stored["position"] != section.position:
+                    moved_from_positions.append(stored["position"])
+                content = stored.get("content") or ""
+                if brief_changed:
+                    content = ""
+                    if stored.get("content"):
+                        invalidated.append(stored["id"])
+                        invalidated_positions.append(section.position)
+                updated_rows.append({**row, "id": stored["id"], "content": content})
+            
+            deleted = [section["id"] for section in stored_sections if section["id"] not in matched_ids]
+            
+            # Running generation jobs must not write content for the old briefs into these rows
+            if updated_rows or new_rows or deleted:
+                get_outline_generations().advance(outline_id)
+            
+            ContentRepository.upsert_outline_sections(updated_rows)
+            created_sections = ContentRepository.create_outline_sections(new_rows)
+            ContentRepository.delete_outline_sections(deleted)
+            rows_written += len(updated_rows) + len(new_rows) + len(deleted)
+            
+            # Drop derived state that no longer matches the stored outline
+            if rows_written:
+                get_speculation_manager().cancel(outline_id)
+                get_idempotency_store().forget(f"completion:{outline_id}")
+            if "additional_data" in changed_outline_data:
+                RetrievalService.invalidate(outline_id)
+                RetrievalService.cache_for_outline(outline_id, input.additional_data)
+            story_state = get_story_state()
+            if story_state and (invalidated_positions or deleted or updated_rows):
+                # Old positions of moved rows hold state recorded for a section that is no longer there
+                changed_positions = invalidated_positions + moved_from_positions
+                changed_positions += [row["position"] for row in updated_rows]
+                changed_positions += [section["position"] for section in stored_sections if section["id"] in deleted]
+                story_state.invalidate(outline_id, from_position=min(changed_positions))
+            
+            return OutlineUpdateResponse(
+                outline_id=outline_id,
+                rows_written=rows_written,
+                sections_created=[section["id"] for section in created_sections],
+                sections_updated=[row["id"] for row in updated_rows],
+                sections_invalidated=invalidated,
+                sections_deleted=deleted,
+            )
+        except Exception as e:
+            logger.error(f"Error updating outline: {str(e)}")
+            raise
+    
+    @staticmethod
+    def speculate_first_section(input: SaveOutlineInput, stored_sections: list):
+        """
+        Start generating the first section of a just-saved outline in the background.
+        
+        Args:
+            input: The outline data that was saved
+            stored_sections: The stored section rows with their generated IDs
+        """
+        sections = [OutlineSection(**section) for section in sorted(stored_sections, key=lambda s: s["position"])]
+        first_section = sections[0]
+        
+        get_speculation_manager().start(
+            first_section.outline_id,
+            GenerateOutlineSectionContentInput(
+                section_id=first_section.id,
+                current_section=first_section,
+                script_title=input.script_title,
+                context=input.additional_data,
+                n_person_view=input.n_person_view or SPECULATION_DEFAULT_N_PERSON_VIEW,
+                excluded_words=input.excluded_words or "",
+                previous_section=None,
+                next_section=sections[1] if len(sections) > 1 else None,
+                model=input.model,
+            ),
+            lambda section_input: ContentService.generate_outline_section_content(section_input, persist=False),
+        )
+    
+    @staticmethod
+    def store_section_content(
+        input: GenerateOutlineSectionContentInput,
+        content: str,
+        generation: Optional[int] = None
+    ) -> bool:
+        """
+        Store generated section content and record it in the story state.
+        
+        Args:
+            input: The input the content was generated for
+            content: The generated section content
+            generation: Outline generation the content was written for; the write is
+                dropped if the outline was edited or regenerated since
+            
+        Returns:
+            Whether the content was stored
+        """
+        outline_id = input.current_section.outline_id
+        if input.section_id:
+            def write():
+                ContentRepository.update_section_content(input.section_id, content)
+            
+            if generation is not None and outline_id:
+                if not get_outline_generations().write_if_current(outline_id, generation, write):
+                    logger.info(f"Dropping content for section {input.section_id}: outline {outline_id} was rewritten")
+                    return False
+            else:
+                write()
+        
+        story_state = get_story_state()
+        if story_state and outline_id:
+            story_state.record_section(outline_id, input.current_section.position, content)
+        return True
+    
+    @staticmethod
+    def generate_outline_section_content(
+        input: GenerateOutlineSectionContentInput,
+        persist: bool = True,
+        generation: Optional[int] = None
+    ) -> GenerateOutlineSectionContentOutput:
         """
         Generate content for a specific outline section and store it in the database.
         
         Args:
             input: The input parameters for section content generation
+            persist: Whether to store the content; speculative runs leave that to the caller
+            generation: Outline generation the content is written for, see store_section_content
             
         Returns:
             The generated section content
@@ -130,8 +532,6 @@ class ContentService:
             print("*"*100)
             print(input)
             print("*"*100)
-            model = ChatOpenAI(model=input.model, temperature=0.0).with_structured_output(GenerateOutlineSectionContentOutput)
-            
             # Get previously generated content if available
             previous_content = ""
             if input.previous_section and input.previous_section.id:
@@ -139,7 +539,21 @@ class ContentService:
                 if previous_section_data and "content" in previous_section_data and previous_section_data["content"]:
                     previous_content = previous_section_data["content"]
             
-            prompt = ChatPromptTemplate.from_messages(
+            # Get the characters and events established so far, if story state tracking is enabled
+            story_state = get_story_state()
+            outline_id = input.current_section.outline_id
+            story_context = ""
+            if story_state and outline_id:
+                story_context = story_state.get_context(outline_id, input.current_section.position)
+            
+            # Only the parts of the additional data relevant to this section go into the prompt
+            reference_material = RetrievalService.get_context(
+                query=f"{input.current_section.title} {input.current_section.description}",
+                text=None if outline_id else input.context,
+                outline_id=outline_id,
+            )
+            
+            prompt = prompt_template(
                 [
                     ("user", """
                     You are a storyteller/narrator. Write a very detailed story/script for the following section:
@@ -162,6 +576,10 @@ class ContentService:
                     Previous Section: {previous_section}
                     Next Section: {next_section}
 
+                    {reference_instruction}
+
+                    {story_state_instruction}
+
                     {previous_content_instruction}
                     """),
                 ]
@@ -181,8 +599,7 @@ class ContentService:
             previous_content_instruction = ""
             if previous_content:
                 # Truncate if too long to fit in context window
-                if len(previous_content) > 1000:
-                    previous_content = previous_content[:1000] + "..."
+                previous_content = previous_content_window(previous_content)
                 
                 previous_content_instruction = f"""
                 Here is the content from the previous section. DO NOT REPEAT phrases, examples, or sentence structures from this:
@@ -192,21 +609,40 @@ class ContentService:
                 Your content should be completely different in wording and examples while maintaining narrative coherence.
                 """
             
-            chain = {
-                "current_section": lambda x: clean_section(input.current_section),
-                "script_title": lambda x: input.script_title,
-                "previous_section": lambda x: clean_section(input.previous_section) if input.previous_section else None,
-                "next_section": lambda x: clean_section(input.next_section) if input.next_section else None,
-                "n_person_view": lambda x: input.n_person_view,
-                "excluded_words": lambda x: input.excluded_words,
-                "previous_content_instruction": lambda x: previous_content_instruction,
-            } | prompt | model
+            reference_instruction = ""
+            if reference_material:
+                reference_instruction = f"""
+                Relevant background material. Use facts from it where they fit this section:
+                
+                {reference_material}
+                """
+            
+            story_state_instruction = ""
+            if story_context:
+                story_state_instruction = f"""
+                Story so far. Keep these characters, places and facts consistent:
+                
+                {story_context}
+                """
+            
+            def build_chain(model_name: str):
+                return {
+                    "current_section": lambda x: clean_section(input.current_section),
+                    "script_title": lambda x: input.script_title,
+                    "previous_section": lambda x: clean_section(input.previous_section) if input.previous_section else None,
+                    "next_section": lambda x: clean_section(input.next_section) if input.next_section else None,
+                    "n_person_view": lambda x: input.n_person_view,
+                    "excluded_words": lambda x: input.excluded_words,
+                    "reference_instruction": lambda x: reference_instruction,
+                    "story_state_instruction": lambda x: story_state_instruction,
+                    "previous_content_instruction": lambda x: previous_content_instruction,
+                } | prompt | structured_model(model_name, GenerateOutlineSectionContentOutput)
             
-            content_output = chain.invoke({})
+            content_output = get_model_router().invoke("section", input.model, build_chain)
             
             # Store the generated content in the database
-            if input.section_id:
-                ContentRepository.update_section_content(input.section_id, content_output.content)
+            if persist:
+                ContentService.store_section_content(input, content_output.content, generation)
             
             return content_output
         except Exception as e:
@@ -214,64 +650,258 @@ class ContentService:
             raise
     
     @staticmethod
-    def generate_remaining_sections(input: GenerateCompleteScriptInput, start_index: int = 1):
+    def regenerate_section(outline_id: str, section_id: str, input: RegenerateSectionInput) -> RegenerateSectionOutput:
+        """
+        Regenerate one section of a stored outline and, optionally, the sections depending on it.
+        
+        A section depends on its predecessor through the truncated previous content
+        shown in its prompt. The following section is only affected if it already has
+        content, is in the same chapter and that window of text changed; with cascade it is regenerated too and
+        the check repeats for its own successor. When story state is tracked, every later
+        section was also written against the replaced state, so all of them are reported stale.
+        
+        Args:
+            outline_id: The ID of the outline
+            section_id: The ID of the section to regenerate
+            input: Generation parameters and cascade options
+            
+        Returns:
+            The regenerated section, the IDs of all regenerated sections and the IDs
+            of sections left stale
+            
+        Raises:
+            ValueError: If the outline or section is not found
+        """
+        try:
+            outline = ContentRepository.get_outline(outline_id, columns="script_title,model")
+            rows = ContentRepository.get_outline_sections(outline_id)
+            sections = [OutlineSection(**row) for row in rows]
+            contents = [row.get("content") or "" for row in rows]
+            
+            target = next((i for i, section in enumerate(sections) if section.id == section_id), None)
+            if target is None:
+                raise ValueError(f"Section {section_id} not found in outline {outline_id}")
+            
+            # Cached completion results, pending speculation and running jobs no longer match the stored content
+            get_idempotency_store().forget(f"completion:{outline_id}")
+            get_speculation_manager().cancel(outline_id)
+            generation = get_outline_generations().advance(outline_id)
+            
+            # Entities and events learned from the old text no longer hold from the target on
+            story_state = get_story_state()
+            if story_state:
+                story_state.invalidate(outline_id, sections[target].position)
+            
+            regenerated_ids = []
+            stale_ids = []
+            max_cascade = input.max_cascade if input.max_cascade is not None else len(sections)
+            # The target plus every section a cascade may rewrite; unused calls are released on exit
+            calls = min(1 + (max_cascade if input.cascade else 0), len(sections) - target)
+            
+            with get_admission_controller().admit(input.model or outline["model"], calls=calls) as ticket:
+                index = target
+                while True:
+                    old_window = previous_content_window(contents[index])
+                    previous_section = sections[index - 1] if index > 0 else None
+                    if previous_section and previous_section.chapter != sections[index].chapter:
+                        # Chapters are drafted independently, so only the previous one's outline is shared
+                        previous_section = previous_section.model_copy(update={"id": None})
+                    
+                    output = ContentService.generate_outline_section_content(GenerateOutlineSectionContentInput(
+                        section_id=sections[index].id,
+                        current_section=sections[index],
+                        script_title=outline["script_title"],
+                        context="",
+                        n_person_view=input.n_person_view,
+                        excluded_words=input.excluded_words,
+                        previous_section=previous_section,
+                        next_section=sections[index + 1] if index < len(sections) - 1 else None,
+                        model=input.model or outline["model"],
+                    ), generation=generation)
+                    contents[index] = output.content
+                    regenerated_ids.append(sections[index].id)
+                    ticket.release()
+                
+                    next_index = index + 1
+                    if next_index >= len(sections) or not contents[next_index]:
+                        break
+                    if get_outline_generations().current(outline_id) != generation:
+                        # Edited or regenerated again meanwhile; that request owns the later sections now
+                        break
+                    if sections[next_index].chapter != sections[index].chapter:
+                        break
+                    if previous_content_window(output.content) == old_window:
+                        break
+                    if not input.cascade or len(regenerated_ids) > max_cascade:
+                        stale_ids.append(sections[next_index].id)
+                        break
+                    index = next_index
+            
+            if story_state:
+                # Every later section was written against the story state that was just replaced
+                stale_ids = [
+                    section.id for section, content in zip(sections[index + 1:], contents[index + 1:]) if content
+                ]
+            
+            return RegenerateSectionOutput(
+                section=WrittenOutlineSection(
+                    id=sections[target].id,
+                    title=sections[target].title,
+                    description=sections[target].description,
+                    instructions=sections[target].instructions,
+                    content=contents[target]
+                ),
+                regenerated_section_ids=regenerated_ids,
+                stale_section_ids=stale_ids,
+            )
+        except Exception as e:
+            logger.error(f"Error regenerating section: {str(e)}")
+            raise
+    
+    @staticmethod
+    def generate_remaining_sections(
+        input: GenerateCompleteScriptInput,
+        start_index: int = 1,
+        ticket: Optional[AdmissionTicket] = None,
+        generation: Optional[int] = None
+    ):
         """
         Background task to generate content for remaining sections.
         
+        Sections of a hierarchical outline are drafted one chapter per worker, so
+        chapters progress concurrently while order within each chapter is kept.
+        The task stops once the outline is edited or regenerated.
+        
         Args:
             input: The input parameters for complete script generation
             start_index: The index to start from (after the first section)
+            ticket: Admission ticket released as each section completes
+            generation: Outline generation the job was started for
         """
         try:
+            chapters = {}
             for index in range(start_index, len(input.outline.sections)):
-                section = input.outline.sections[index]
-                previous_section = input.outline.sections[index - 1] if index > 0 else None
-                next_section = input.outline.sections[index + 1] if index < len(input.outline.sections) - 1 else None
-
-                ContentService.generate_outline_section_content(GenerateOutlineSectionContentInput(
-                    section_id=section.id,
-                    current_section=section,
-                    script_title=input.script_title,
-                    context=input.context,
-                    n_person_view=input.n_person_view,
-                    excluded_words=input.excluded_words,
-                    previous_section=previous_section,
-                    next_section=next_section,
-                    model=input.model,
-                ))
-                
-                logger.info(f"Generated content for section {index+1} of {len(input.outline.sections)}")
+                chapters.setdefault(input.outline.sections[index].chapter, []).append(index)
+            
+            if len(chapters) <= 1:
+                for indices in chapters.values():
+                    ContentService._generate_sections_in_order(input, indices, ticket, generation)
+            else:
+                with ThreadPoolExecutor(max_workers=CHAPTER_CONCURRENCY, thread_name_prefix="chapter") as pool:
+                    list(pool.map(
+                        profiled(lambda indices: ContentService._generate_sections_in_order(input, indices, ticket, generation)),
+                        chapters.values()
+                    ))
                 
         except Exception as e:
             logger.error(f"Error in background task generating sections: {str(e)}")
+            # Let the next completion request start over instead of replaying a dead job's first section
+            outline_id = input.outline.id or (input.outline.sections[0].outline_id if input.outline.sections else None)
+            if outline_id:
+                get_idempotency_store().forget(f"completion:{outline_id}", request_fingerprint(input))
+        finally:
+            if ticket:
+                ticket.close()
+    
+    @staticmethod
+    def _generate_sections_in_order(
+        input: GenerateCompleteScriptInput,
+        indices: list,
+        ticket: Optional[AdmissionTicket] = None,
+        generation: Optional[int] = None
+    ):
+        """Generate the given sections one after another, each seeing the content of the one before."""
+        sections = input.outline.sections
+        for index in indices:
+            section = sections[index]
+            if generation is not None and section.outline_id:
+                if get_outline_generations().current(section.outline_id) != generation:
+                    logger.info(f"Stopping generation for outline {section.outline_id}: it was rewritten")
+                    return
+            previous_section = sections[index - 1] if index > 0 else None
+            next_section = sections[index + 1] if index < len(sections) - 1 else None
+            
+            if previous_section and previous_section.chapter != section.chapter:
+                # The previous chapter is drafted concurrently, so only its outline is shared
+                previous_section = previous_section.model_copy(update={"id": None})
+
+            ContentService.generate_outline_section_content(GenerateOutlineSectionContentInput(
+                section_id=section.id,
+                current_section=section,
+                script_title=input.script_title,
+                context=input.context,
+                n_person_view=input.n_person_view,
+                excluded_words=input.excluded_words,
+                previous_section=previous_section,
+                next_section=next_section,
+                model=input.model,
+            ), generation=generation)
+            
+            if ticket:
+                ticket.release()
+            logger.info(f"Generated content for section {index+1} of {len(sections)}")
     
     @staticmethod
     def generate_complete_script_incremental(
         background_tasks: BackgroundTasks, 
-        input: GenerateCompleteScriptInput
+        input: GenerateCompleteScriptInput,
+        idempotency_key: Optional[str] = None
     ) -> WrittenOutlineSection:
         """
         Generate the first section immediately and queue the rest for background processing.
         
+        Requests for an outline that already has a generation job with the same
+        parameters get that job's first section back without starting another run.
+        
         Args:
             background_tasks: FastAPI BackgroundTasks object
             input: The input parameters for complete script generation
+            idempotency_key: Client-supplied key; repeated requests with it return the first result
             
         Returns:
             The first section with generated content
         """
+        store = get_idempotency_store()
+        if idempotency_key:
+            return store.run(
+                f"complete:{idempotency_key}",
+                request_fingerprint(input),
+                lambda: ContentService.generate_complete_script_incremental(background_tasks, input),
+            )
+        
+        outline_id = input.outline.id or (input.outline.sections[0].outline_id if input.outline.sections else None)
+        tag_outline(outline_id)
+        if outline_id:
+            return store.run(
+                f"completion:{outline_id}",
+                request_fingerprint(input),
+                lambda: ContentService._start_script_generation(background_tasks, input),
+                ttl_seconds=COMPLETION_DEDUP_TTL_SECONDS,
+                replace_on_mismatch=True,
+            )
+        return ContentService._start_script_generation(background_tasks, input)
+    
+    @staticmethod
+    def _start_script_generation(
+        background_tasks: BackgroundTasks, 
+        input: GenerateCompleteScriptInput
+    ) -> WrittenOutlineSection:
+        """Generate the first section and queue the remaining ones, without deduplication."""
         try:
             print("*"*100)
             print(input)
             print("*"*100)
             if not input.outline.sections:
                 raise ValueError("No sections found in the outline")
-                
+            
+            # Shed the request up front if the backlog would push it past the latency SLO
+            ticket = get_admission_controller().admit(input.model, calls=len(input.outline.sections))
+            
             # Generate content for the first section immediately
             first_section = input.outline.sections[0]
             next_section = input.outline.sections[1] if len(input.outline.sections) > 1 else None
             
-            written_section = ContentService.generate_outline_section_content(GenerateOutlineSectionContentInput(
+            first_section_input = GenerateOutlineSectionContentInput(
                 section_id=first_section.id,
                 current_section=first_section,
                 script_title=input.script_title,
@@ -281,14 +911,39 @@ class ContentService:
                 previous_section=None,
                 next_section=next_section,
                 model=input.model,
-            ))
+            )
+            
+            # Use the speculative result started when the outline was saved, if it matches
+            written_section = None
+            outline_id = input.outline.id or first_section.outline_id
+            if outline_id:
+                written_section = get_speculation_manager().claim(outline_id, first_section_input)
+            
+            # Writes of this job are dropped once the outline is edited or regenerated
+            generation = None
+            if first_section.outline_id:
+                generation = get_outline_generations().current(first_section.outline_id)
+            
+            try:
+                if written_section is not None:
+                    ContentService.store_section_content(first_section_input, written_section.content, generation)
+                else:
+                    written_section = ContentService.generate_outline_section_content(
+                        first_section_input, generation=generation
+                    )
+            except Exception:
+                ticket.close()
+                raise
+            ticket.release()
             
             # Queue the remaining sections for background processing
             if len(input.outline.sections) > 1:
                 background_tasks.add_task(
                     ContentService.generate_remaining_sections,
                     input=input,
-                    start_index=1
+                    start_index=1,
+                    ticket=ticket,
+                    generation=generation
                 )
             
             # Return the first section immediately
@@ -0,0 +1,81 @@
+import itertools
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+# Outlines whose generation is tracked in process, least recently used first out
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "4096"))
+
+
+class _Generation:
+    def __init__(self, value: int):
+        self.value = value
+        self.lock = threading.Lock()
+
+
+class OutlineGenerations:
+    """
+    Tells background writers when the sections they are writing have been rewritten.
+
+    Each outline has a generation number that moves forward whenever its sections
+    are edited or regenerated. A job reads the number before it starts and writes
+    through `write_if_current`, which drops the write once the number has moved.
+    The check and the write hold the outline's lock, so an `advance` lands either
+    before the check or after the write. Numbers come from one process-wide
+    counter; an outline evicted from the cache comes back with a fresh number, so
+    jobs started before the eviction stop writing rather than overwrite newer content.
+    """
+
+    def __init__(self, max_outlines: int = GENERATION_CACHE_SIZE):
+        self._entries: "OrderedDict[str, _Generation]" = OrderedDict()
+        self._max_outlines = max_outlines
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _entry(self, outline_id: str) -> _Generation:
+        with self._lock:
+            entry = self._entries.get(outline_id)
+            if entry is None:
+                entry = self._entries[outline_id] = _Generation(next(self._counter))
+                while len(self._entries) > self._max_outlines:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(outline_id)
+            return entry
+
+    def current(self, outline_id: str) -> int:
+        """The outline's generation, to pass to `write_if_current` later."""
+        return self._entry(outline_id).value
+
+    def advance(self, outline_id: str) -> int:
+        """Supersede every job started on the outline so far and return the new generation."""
+        entry = self._entry(outline_id)
+        with entry.lock:
+            with self._lock:
+                entry.value = next(self._counter)
+            return entry.value
+
+    def write_if_current(self, outline_id: str, generation: int, write: Callable[[], None]) -> bool:
+        """
+        Run `write` unless the outline was rewritten since `generation`.
+
+        Returns:
+            Whether the write ran
+        """
+        entry = self._entry(outline_id)
+        with entry.lock:
+            if entry.value != generation:
+                return False
+            write()
+            return True
+
+
+@lru_cache(maxsize=1)
+def get_outline_generations() -> OutlineGenerations:
+    """Return the shared outline generations."""
+    return OutlineGenerations()
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, Dict, Optional, TypeVar
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+COMPLETION_DEDUP_TTL_SECONDS = float(os.getenv("COMPLETION_DEDUP_TTL_SECONDS", "900"))
+
+T = TypeVar("T")
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when an idempotency key is reused for a different request."""
+
+
+def request_fingerprint(request: BaseModel) -> str:
+    """Hash of a request body, used to tell a retry from a different request under the same key."""
+    return hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    def __init__(self, fingerprint: str, ttl_seconds: float):
+        self.fingerprint = fingerprint
+        self.future: Future = Future()
+        self.expires_at = time.monotonic() + ttl_seconds
+
+
+class IdempotencyStore:
+    """
+    In-process TTL store that runs each keyed operation once.
+
+    Repeated calls with the same key get the original result, waiting for it
+    if the first call is still running. Failed operations are forgotten so a
+    retry runs them again.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self.replays = 0
+
+    def run(
+        self,
+        key: str,
+        fingerprint: str,
+        operation: Callable[[], T],
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+        replace_on_mismatch: bool = False,
+    ) -> T:
+        """
+        Run an operation once per key.
+
+        Args:
+            key: The deduplication key
+            fingerprint: Identifies the request made under the key
+            operation: Function performing the work
+            ttl_seconds: How long the result is kept for repeated calls
+            replace_on_mismatch: Run again instead of raising when the fingerprint differs
+
+        Returns:
+            The result of the operation, possibly from an earlier call
+
+        Raises:
+            IdempotencyConflictError: If the key was used for a different request
+        """
+        with self._lock:
+            self._prune()
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint != fingerprint:
+                if not replace_on_mismatch:
+                    raise IdempotencyConflictError(f"Idempotency key {key} was already used for a different request")
+                entry = None
+            owner = entry is None
+            if owner:
+                entry = _Entry(fingerprint, ttl_seconds)
+                self._entries[key] = entry
+            else:
+                self.replays += 1
+
+        if not owner:
+            logger.info(f"Returning result of earlier request for {key}")
+            return entry.future.result()
+
+        try:
+            result = operation()
+        except BaseException as e:
+            entry.future.set_exception(e)
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            raise
+        entry.future.set_result(result)
+        return result
+
+    def forget(self, key: str, fingerprint: Optional[str] = None) -> None:
+        """Drop a key so the next call runs the operation again, only if it holds `fingerprint` when given."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (fingerprint is None or entry.fingerprint == fingerprint):
+                del self._entries[key]
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now and entry.future.done()]:
+            del self._entries[key]
+
+
+@lru_cache(maxsize=1)
+def get_idempotency_store() -> IdempotencyStore:
+    """Return the shared idempotency store."""
+    return IdempotencyStore()
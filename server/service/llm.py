@@ -0,0 +1,10 @@
+def structured_model(model: str, schema, temperature: float = 0.0):
+    """Build a chat model with structured output, importing LangChain on first use."""
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model, temperature=temperature).with_structured_output(schema)
+
+
+def prompt_template(messages):
+    """Build a chat prompt template, importing LangChain on first use."""
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages(messages)
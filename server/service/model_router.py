@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from models.metrics import ModelLatencyStats
+from middleware.profiling import profiled_thread
+
+
+logger = logging.getLogger(__name__)
+
+MODEL_TIMEOUT_SECONDS = float(os.getenv("MODEL_TIMEOUT_SECONDS", "180"))
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+# Delay before hedging while a model has too few samples for a meaningful p95
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("HEDGE_DEFAULT_DELAY_SECONDS", "60"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# Upper bound on the share of calls that may send a duplicate request
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "200"))
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    """Parse "a=b,c=d" into {"a": "b", "c": "d"}."""
+    pairs = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, target = item.split("=", 1)
+            pairs[key.strip()] = target.strip()
+    return pairs
+
+
+# Alternate model per primary, e.g. "gpt-4o=gpt-4o-mini,gpt-4o-mini=gpt-4.1-mini"
+MODEL_FALLBACKS = _parse_pairs(os.getenv("MODEL_FALLBACKS", ""))
+MODEL_DEFAULT_FALLBACK = os.getenv("MODEL_DEFAULT_FALLBACK", "")
+# Model per task overriding the requested one, e.g. "outline=gpt-4o-mini,story_state=gpt-4o-mini"
+MODEL_POLICIES = _parse_pairs(os.getenv("MODEL_POLICIES", ""))
+
+
+class _ModelStats:
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def percentile(self, q: int) -> Optional[float]:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else None
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[q - 1]
+
+
+class ModelRouter:
+    """
+    Routes LLM calls by task, hedges slow calls and falls back to an alternate model.
+
+    Latency is tracked per task and model, since an outline, a section and a
+    story state extraction differ widely in output length.
+
+    All calls run on one long-lived event loop in a background thread, so the
+    HTTP clients LangChain shares across the process stay bound to a single
+    loop, and the losing request of a hedged pair can be cancelled rather than
+    left running. Callers block until their call completes.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._window = window
+        self._stats: Dict[Tuple[str, str], _ModelStats] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="model-router", daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def _model_stats(self, task: str, model: str) -> _ModelStats:
+        with self._lock:
+            return self._stats.setdefault((task, model), _ModelStats(self._window))
+
+    def model_for(self, task: str, requested_model: str) -> str:
+        """Get the model to use for a task, applying any configured policy."""
+        return MODEL_POLICIES.get(task, requested_model)
+
+    def fallback_for(self, model: str) -> Optional[str]:
+        fallback = MODEL_FALLBACKS.get(model, MODEL_DEFAULT_FALLBACK)
+        return fallback if fallback and fallback != model else None
+
+    def hedge_delay(self, task: str, model: str) -> float:
+        """Seconds to wait for a response before sending a duplicate request."""
+        stats = self._model_stats(task, model)
+        with self._lock:
+            if len(stats.latencies) < HEDGE_MIN_SAMPLES:
+                return HEDGE_DEFAULT_DELAY_SECONDS
+            return stats.percentile(95)
+
+    def expected_latency(self, task: str, model: str) -> Optional[float]:
+        """Median latency of recent calls to a model for a task, or None before any call completed."""
+        stats = self._model_stats(task, model)
+        with self._lock:
+            return stats.percentile(50)
+
+    def _allow_hedge(self, task: str, model: str) -> bool:
+        stats = self._model_stats(task, model)
+        with self._lock:
+            if not HEDGING_ENABLED or stats.hedges + 1 > max(1.0, stats.calls * HEDGE_MAX_RATIO):
+                return False
+            stats.hedges += 1
+            return True
+
+    def invoke(self, task: str, model: str, build_chain: Callable[[str], Any]) -> Any:
+        """
+        Run a chain with hedging and fallback.
+
+        Args:
+            task: Name of the task, used to look up a model policy
+            model: The model requested by the caller
+            build_chain: Function building the runnable chain for a given model name
+
+        Returns:
+            The chain's output from the first model call that succeeds
+
+        Raises:
+            The last error if the primary and fallback models both fail
+        """
+        primary = self.model_for(task, model)
+        candidates = [primary]
+        fallback = self.fallback_for(primary)
+        if fallback:
+            candidates.append(fallback)
+
+        last_error: Optional[BaseException] = None
+        for index, candidate in enumerate(candidates):
+            if index > 0:
+                stats = self._model_stats(task, primary)
+                with self._lock:
+                    stats.fallbacks += 1
+                logger.warning(f"Falling back from {primary} to {candidate} for {task}: {str(last_error)}")
+            try:
+                # Chains are built here so that imports and client setup never block the shared loop
+                chain = build_chain(candidate)
+                future = asyncio.run_coroutine_threadsafe(self._race(task, candidate, chain), self._event_loop())
+                with profiled_thread(self._loop_thread.ident):
+                    return future.result()
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def _attempt(self, stats: _ModelStats, chain: Any) -> Any:
+        try:
+            return await chain.ainvoke({})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            with self._lock:
+                stats.errors += 1
+            raise
+
+    def _record_latency(self, stats: _ModelStats, start: float) -> None:
+        with self._lock:
+            stats.latencies.append(time.perf_counter() - start)
+
+    async def _race(self, task: str, model: str, chain: Any) -> Any:
+        stats = self._model_stats(task, model)
+        with self._lock:
+            stats.calls += 1
+
+        # One latency sample per call, measured from here: a hedged call counts the wait
+        # before the hedge, and a call that times out or is cancelled counts what it took so far
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + MODEL_TIMEOUT_SECONDS
+        primary = asyncio.ensure_future(self._attempt(stats, chain))
+        attempts = {primary}
+        try:
+            delay = self.hedge_delay(task, model)
+            if delay < MODEL_TIMEOUT_SECONDS:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done and self._allow_hedge(task, model):
+                    logger.info(f"Hedging {model} {task} call after {delay:.1f}s")
+                    attempts.add(asyncio.ensure_future(self._attempt(stats, chain)))
+
+            last_error: Optional[BaseException] = None
+            while attempts:
+                remaining = deadline - loop.time()
+                done, _ = await asyncio.wait(attempts, timeout=max(0.0, remaining), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._record_latency(stats, start)
+                    with self._lock:
+                        stats.timeouts += 1
+                    raise TimeoutError(f"{model} did not respond within {MODEL_TIMEOUT_SECONDS:.0f}s")
+                for attempt in done:
+                    attempts.discard(attempt)
+                    if attempt.exception() is None:
+                        self._record_latency(stats, start)
+                        if attempt is not primary:
+                            with self._lock:
+                                stats.hedge_wins += 1
+                        return attempt.result()
+                    last_error = attempt.exception()
+            raise last_error
+        except asyncio.CancelledError:
+            self._record_latency(stats, start)
+            raise
+        finally:
+            # Cancel the losing request, if any
+            for attempt in attempts:
+                attempt.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+    def stats(self) -> List[ModelLatencyStats]:
+        with self._lock:
+            return [
+                ModelLatencyStats(
+                    task=task,
+                    model=model,
+                    samples=len(stats.latencies),
+                    p50_seconds=stats.percentile(50) or 0.0,
+                    p95_seconds=stats.percentile(95) or 0.0,
+                    calls=stats.calls,
+                    errors=stats.errors,
+                    timeouts=stats.timeouts,
+                    hedges=stats.hedges,
+                    hedge_wins=stats.hedge_wins,
+                    fallbacks=stats.fallbacks,
+                )
+                for (task, model), stats in sorted(self._stats.items())
+            ]
+
+
+@lru_cache(maxsize=1)
+def get_model_router() -> ModelRouter:
+    """Return the shared model router."""
+    return ModelRouter()
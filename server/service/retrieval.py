@@ -0,0 +1,260 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+from repository.content import ContentRepository
+
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "120"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_OUTLINE_TOP_K = int(os.getenv("RETRIEVAL_OUTLINE_TOP_K", "8"))
+# additional_data shorter than this is passed to the prompt whole
+RETRIEVAL_MIN_WORDS = int(os.getenv("RETRIEVAL_MIN_WORDS", "600"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))
+
+INDEX_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the their this to was were will with".split()
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def chunk_text(text: str, chunk_words: int = RETRIEVAL_CHUNK_WORDS) -> List[str]:
+    """
+    Split text into passages of at most about `chunk_words` words.
+
+    Paragraph and sentence boundaries are kept where possible; sentences longer
+    than a chunk are split on word boundaries.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_words = 0
+
+    def flush():
+        nonlocal current, current_words
+        if current:
+            chunks.append(" ".join(current))
+        current, current_words = [], 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        for sentence in _SENTENCE_PATTERN.split(paragraph.strip()):
+            words = sentence.split()
+            while len(words) > chunk_words:
+                flush()
+                chunks.append(" ".join(words[:chunk_words]))
+                words = words[chunk_words:]
+            if not words:
+                continue
+            if current_words + len(words) > chunk_words:
+                flush()
+            current.append(" ".join(words))
+            current_words += len(words)
+        # Start a new chunk at paragraph breaks once the current one is reasonably full
+        if current_words >= chunk_words // 2:
+            flush()
+    flush()
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 index over text passages."""
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[tuple]] = {}
+        for doc_id, chunk in enumerate(chunks):
+            term_freqs = Counter(_tokenize(chunk))
+            self._lengths.append(sum(term_freqs.values()))
+            for term, freq in term_freqs.items():
+                self._postings.setdefault(term, []).append((doc_id, freq))
+
+        self.word_count = sum(len(chunk.split()) for chunk in chunks)
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        n_docs = len(chunks)
+        self._idf = {
+            term: math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    @classmethod
+    def build(cls, text: str) -> "BM25Index":
+        return cls(chunk_text(text))
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[str]:
+        """
+        Get the `k` passages most relevant to the query, in document order.
+
+        Args:
+            query: Free text to match against the passages
+            k: Maximum number of passages to return
+
+        Returns:
+            The matching passages, or an empty list if nothing matches
+        """
+        scores: Dict[int, float] = {}
+        for term in set(_tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for doc_id, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        top = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [self.chunks[doc_id] for doc_id in sorted(top)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": INDEX_VERSION, "k1": self.k1, "b": self.b, "chunks": self.chunks}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25Index":
+        return cls(data["chunks"], k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+
+
+class RetrievalService:
+    """Builds, stores and queries per-outline indexes over `additional_data`."""
+
+    _cache: "OrderedDict[str, BM25Index]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _cache_get(key: str) -> Optional[BM25Index]:
+        with RetrievalService._lock:
+            index = RetrievalService._cache.get(key)
+            if index is not None:
+                RetrievalService._cache.move_to_end(key)
+            return index
+
+    @staticmethod
+    def _cache_put(key: str, index: BM25Index) -> None:
+        with RetrievalService._lock:
+            RetrievalService._cache[key] = index
+            RetrievalService._cache.move_to_end(key)
+            while len(RetrievalService._cache) > RETRIEVAL_CACHE_SIZE:
+                RetrievalService._cache.popitem(last=False)
+
+    @staticmethod
+    def needs_index(text: Optional[str]) -> bool:
+        return bool(text) and len(text.split()) > RETRIEVAL_MIN_WORDS
+
+    @staticmethod
+    def build_index(text: str) -> Optional[Dict[str, Any]]:
+        """
+        Build a serialized index for storage with an outline.
+
+        Args:
+            text: The outline's additional_data
+
+        Returns:
+            The serialized index, or None if the text is short enough to use whole
+        """
+        if not RetrievalService.needs_index(text):
+            return None
+        index = BM25Index.build(text)
+        RetrievalService._cache_put(RetrievalService._text_key(text), index)
+        return index.to_dict()
+
+    @staticmethod
+    def cache_for_outline(outline_id: str, text: str) -> None:
+        """Keep the index of a just-saved outline in process so its first sections skip the DB read."""
+        if text:
+            RetrievalService._cache_put(f"outline:{outline_id}", RetrievalService._index_for_text(text))
+
+    @staticmethod
+    def invalidate(outline_id: str) -> None:
+        with RetrievalService._lock:
+            RetrievalService._cache.pop(f"outline:{outline_id}", None)
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return "text:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _index_for_text(text: str) -> BM25Index:
+        key = RetrievalService._text_key(text)
+        index = RetrievalService._cache_get(key)
+        if index is None:
+            index = BM25Index.build(text)
+            RetrievalService._cache_put(key, index)
+        return index
+
+    @staticmethod
+    def _index_for_outline(outline_id: str) -> BM25Index:
+        key = f"outline:{outline_id}"
+        index = RetrievalService._cache_get(key)
+        if index is not None:
+            return index
+
+        # All columns, since additional_data_index only exists once its migration has run
+        outline = ContentRepository.get_outline(outline_id)
+        stored = outline.get("additional_data_index")
+        additional_data = outline.get("additional_data") or ""
+        if stored and stored.get("version") == INDEX_VERSION:
+            index = BM25Index.from_dict(stored)
+        else:
+            index = RetrievalService._index_for_text(additional_data)
+            if "additional_data_index" in outline and RetrievalService.needs_index(additional_data):
+                # Outline saved before indexing was added; store the index built now
+                ContentRepository.update_outline(outline_id, {"additional_data_index": index.to_dict()})
+
+        RetrievalService._cache_put(key, index)
+        return index
+
+    @staticmethod
+    def get_context(
+        query: str,
+        text: Optional[str] = None,
+        outline_id: Optional[str] = None,
+        k: int = RETRIEVAL_TOP_K,
+    ) -> str:
+        """
+        Get the parts of `additional_data` relevant to a query, bounded in size.
+
+        Short texts are returned whole. Long texts are served from the outline's
+        stored index when `outline_id` is given, otherwise from an index built
+        from `text` and cached in process.
+
+        Args:
+            query: What the prompt is about, e.g. a section title and description
+            text: The additional data, when already at hand
+            outline_id: The ID of the outline the additional data belongs to
+            k: Maximum number of passages to return
+
+        Returns:
+            The relevant passages separated by blank lines
+        """
+        try:
+            if text is not None and not RetrievalService.needs_index(text):
+                return text
+
+            index = None
+            if outline_id:
+                index = RetrievalService._index_for_outline(outline_id)
+            elif text:
+                index = RetrievalService._index_for_text(text)
+
+            if index is None:
+                return ""
+            if index.word_count <= RETRIEVAL_MIN_WORDS:
+                return "\n\n".join(index.chunks)
+            return "\n\n".join(index.search(query, k=k))
+        except Exception as e:
+            logger.error(f"Error retrieving additional data context: {str(e)}")
+            return ""
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+from models.content import GenerateOutlineSectionContentInput, GenerateOutlineSectionContentOutput
+from models.metrics import SpeculationStats
+from middleware.profiling import profiled
+
+
+logger = logging.getLogger(__name__)
+
+# Start generating section 0 when an outline is saved; SaveOutlineInput.speculate overrides it per request
+SPECULATIVE_FIRST_SECTION = os.getenv("SPECULATIVE_FIRST_SECTION", "false").lower() == "true"
+SPECULATION_TTL_SECONDS = float(os.getenv("SPECULATION_TTL_SECONDS", "600"))
+SPECULATION_MAX_WORKERS = int(os.getenv("SPECULATION_MAX_WORKERS", "4"))
+SPECULATION_DEFAULT_N_PERSON_VIEW = os.getenv("SPECULATION_DEFAULT_N_PERSON_VIEW", "third")
+
+
+def _fingerprint(input: GenerateOutlineSectionContentInput) -> dict:
+    """
+    The parts of a section request that affect the prompt.
+
+    Section IDs only locate rows, and `context` is not used for prompts when the
+    outline ID is known, since passages come from the outline's stored index.
+    """
+    def section(value):
+        return value.model_dump(exclude={"id", "outline_id"}) if value else None
+
+    return {
+        "current_section": section(input.current_section),
+        "previous_section": section(input.previous_section),
+        "next_section": section(input.next_section),
+        "script_title": input.script_title,
+        "n_person_view": input.n_person_view,
+        "excluded_words": input.excluded_words,
+        "model": input.model,
+    }
+
+
+class _Speculation:
+    def __init__(self, input: GenerateOutlineSectionContentInput, future: Future):
+        self.fingerprint = _fingerprint(input)
+        self.future = future
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+
+class SpeculationManager:
+    """
+    Pre-generates the first section of saved outlines and hands it to the next completion request.
+
+    Speculative results are not written to the database; the completion request that
+    claims a result persists it, so a discarded speculation never overwrites real content.
+    """
+
+    def __init__(self, max_workers: int = SPECULATION_MAX_WORKERS, ttl_seconds: float = SPECULATION_TTL_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculation")
+        self._ttl_seconds = ttl_seconds
+        self._speculations: Dict[str, _Speculation] = {}
+        self._lock = threading.Lock()
+        self._started = 0
+        self._hits = 0
+        self._misses = 0
+        self._wasted = 0
+        self._failed = 0
+        self._seconds_saved = 0.0
+
+    def start(
+        self,
+        outline_id: str,
+        input: GenerateOutlineSectionContentInput,
+        generate: Callable[[GenerateOutlineSectionContentInput], GenerateOutlineSectionContentOutput],
+    ) -> None:
+        """
+        Start generating a section in the background.
+
+        Args:
+            outline_id: The ID of the saved outline
+            input: The request the completion endpoint is expected to make for section 0
+            generate: Function producing the section content without persisting it
+        """
+        self._expire()
+        future = self._executor.submit(profiled(generate), input)
+        speculation = _Speculation(input, future)
+        future.add_done_callback(lambda _: setattr(speculation, "finished_at", time.monotonic()))
+
+        with self._lock:
+            previous = self._speculations.pop(outline_id, None)
+            self._speculations[outline_id] = speculation
+            self._started += 1
+        if previous is not None:
+            self._discard(previous)
+
+    def claim(
+        self, outline_id: str, input: GenerateOutlineSectionContentInput
+    ) -> Optional[GenerateOutlineSectionContentOutput]:
+        """
+        Take the speculative result for an outline if it was made for the same request.
+
+        Waits for a speculation that is still running. A speculation made for different
+        section parameters is cancelled and counted as waste.
+
+        Args:
+            outline_id: The ID of the outline being completed
+            input: The section request about to be made
+
+        Returns:
+            The speculative content, or None if the caller must generate it
+        """
+        with self._lock:
+            speculation = self._speculations.pop(outline_id, None)
+            if speculation is None:
+                self._misses += 1
+                return None
+
+        if speculation.fingerprint != _fingerprint(input):
+            logger.info(f"Discarding speculative first section for outline {outline_id}: outline changed")
+            self._discard(speculation)
+            return None
+
+        claimed_at = time.monotonic()
+        try:
+            result = speculation.future.result()
+        except Exception as e:
+            logger.error(f"Speculative generation failed for outline {outline_id}: {str(e)}")
+            with self._lock:
+                self._failed += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+            # Generation time the caller did not have to wait for
+            self._seconds_saved += min(claimed_at, speculation.finished_at or claimed_at) - speculation.started_at
+        return result
+
+    def cancel(self, outline_id: str) -> None:
+        """Cancel the speculation for an outline that was edited after saving."""
+        with self._lock:
+            speculation = self._speculations.pop(outline_id, None)
+        if speculation is not None:
+            self._discard(speculation)
+
+    def stats(self) -> SpeculationStats:
+        self._expire()
+        with self._lock:
+            resolved = self._hits + self._wasted
+            return SpeculationStats(
+                started=self._started,
+                in_flight=len(self._speculations),
+                hits=self._hits,
+                misses=self._misses,
+                wasted=self._wasted,
+                failed=self._failed,
+                hit_ratio=self._hits / resolved if resolved else 0.0,
+                waste_ratio=self._wasted / resolved if resolved else 0.0,
+                avg_seconds_saved=self._seconds_saved / self._hits if self._hits else 0.0,
+            )
+
+    def _discard(self, speculation: _Speculation) -> None:
+        # A running generation cannot be interrupted; its result is simply dropped
+        speculation.future.cancel()
+        with self._lock:
+            self._wasted += 1
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                outline_id for outline_id, speculation in self._speculations.items()
+                if now - speculation.started_at > self._ttl_seconds
+            ]
+            speculations = [self._speculations.pop(outline_id) for outline_id in expired]
+        for speculation in speculations:
+            self._discard(speculation)
+
+
+@lru_cache(maxsize=1)
+def get_speculation_manager() -> SpeculationManager:
+    """Return the shared speculation manager."""
+    return SpeculationManager()
@@ -0,0 +1,411 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, List, Optional
+from models.story_state import SectionStoryState, TrackedEntity, TrackedEvent
+from middleware.profiling import profiled
+from service.llm import structured_model, prompt_template
+from service.model_router import get_model_router
+
+
+logger = logging.getLogger(__name__)
+
+# "memory" keeps the graph in process, "neo4j" persists it; unset disables story state
+STORY_STATE_BACKEND = os.getenv("STORY_STATE_BACKEND", "").lower()
+STORY_STATE_MODEL = os.getenv("STORY_STATE_MODEL", "gpt-4o-mini")
+STORY_STATE_MAX_ENTITIES = int(os.getenv("STORY_STATE_MAX_ENTITIES", "20"))
+STORY_STATE_MAX_EVENTS = int(os.getenv("STORY_STATE_MAX_EVENTS", "10"))
+# Seconds a context lookup may wait for earlier sections still being extracted; 0 serves the cache as is
+STORY_STATE_WAIT_SECONDS = float(os.getenv("STORY_STATE_WAIT_SECONDS", "0"))
+# Outlines kept in process, least recently used first out
+STORY_STATE_CACHE_SIZE = int(os.getenv("STORY_STATE_CACHE_SIZE", "256"))
+
+
+def _entity_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+class OutlineStoryState:
+    """Entities and events of one outline, indexed by section position."""
+
+    def __init__(self):
+        self.entities: Dict[str, TrackedEntity] = {}
+        self.events: List[TrackedEvent] = []
+
+    def apply(self, position: int, state: SectionStoryState) -> None:
+        """Merge the state extracted from the section at `position`."""
+        for entity in state.entities:
+            key = _entity_key(entity.name)
+            existing = self.entities.get(key)
+            self.entities[key] = TrackedEntity(
+                **entity.model_dump(),
+                first_position=min(existing.first_position, position) if existing else position,
+                last_position=max(existing.last_position, position) if existing else position,
+            )
+
+        # A regenerated section replaces the events recorded for it
+        self.events = [event for event in self.events if event.position != position]
+        self.events.extend(TrackedEvent(**event.model_dump(), position=position) for event in state.events)
+        self.events.sort(key=lambda event: event.position)
+
+    def truncate(self, from_position: int) -> None:
+        """Forget everything learned from sections at or after `from_position`."""
+        self.events = [event for event in self.events if event.position < from_position]
+        for key, entity in list(self.entities.items()):
+            if entity.first_position >= from_position:
+                del self.entities[key]
+            elif entity.last_position >= from_position:
+                entity.last_position = from_position - 1
+
+    def entity_names(self) -> List[str]:
+        return [entity.name for entity in self.entities.values()]
+
+    def summary(self, before_position: int) -> str:
+        """Compact text summary of the story before the section at `before_position`."""
+        entities = sorted(
+            (entity for entity in self.entities.values() if entity.first_position < before_position),
+            key=lambda entity: entity.last_position,
+            reverse=True,
+        )[:STORY_STATE_MAX_ENTITIES]
+        events = [event for event in self.events if event.position < before_position][-STORY_STATE_MAX_EVENTS:]
+
+        lines = []
+        if entities:
+            lines.append("Characters and entities:")
+            lines.extend(f"- {entity.name} ({entity.kind}): {entity.description}" for entity in entities)
+        if events:
+            lines.append("Key events so far:")
+            lines.extend(f"- [section {event.position}] {event.summary}" for event in events)
+        return "\n".join(lines)
+
+
+class InMemoryStoryGraph:
+    """
+    Story graph backend kept in process memory, for offline and local use.
+
+    Only the STORY_STATE_CACHE_SIZE most recently used outlines are kept.
+    """
+
+    def __init__(self, max_outlines: int = STORY_STATE_CACHE_SIZE):
+        self._sections: "OrderedDict[str, Dict[int, SectionStoryState]]" = OrderedDict()
+        self._max_outlines = max_outlines
+        self._lock = threading.Lock()
+
+    def save_section(self, outline_id: str, position: int, state: SectionStoryState) -> None:
+        with self._lock:
+            self._sections.setdefault(outline_id, {})[position] = state
+            self._sections.move_to_end(outline_id)
+            while len(self._sections) > self._max_outlines:
+                self._sections.popitem(last=False)
+
+    def load(self, outline_id: str) -> OutlineStoryState:
+        with self._lock:
+            if outline_id in self._sections:
+                self._sections.move_to_end(outline_id)
+            sections = sorted(self._sections.get(outline_id, {}).items())
+        story = OutlineStoryState()
+        for position, state in sections:
+            story.apply(position, state)
+        return story
+
+    def delete_from(self, outline_id: str, position: int) -> None:
+        with self._lock:
+            sections = self._sections.get(outline_id, {})
+            for stored_position in [p for p in sections if p >= position]:
+                del sections[stored_position]
+
+
+class Neo4jStoryGraph:
+    """Story graph backend persisted in Neo4j using fixed, parameterized queries."""
+
+    SAVE_ENTITIES = """
+    UNWIND $entities AS entity
+    MERGE (e:StoryEntity {outline_id: $outline_id, key: entity.key})
+    ON CREATE SET e.first_position = $position, e.last_position = $position
+    SET e.name = entity.name,
+        e.kind = entity.kind,
+        e.description = entity.description,
+        e.first_position = CASE WHEN e.first_position > $position THEN $position ELSE e.first_position END,
+        e.last_position = CASE WHEN e.last_position < $position THEN $position ELSE e.last_position END
+    """
+
+    DELETE_SECTION_EVENTS = """
+    MATCH (ev:StoryEvent {outline_id: $outline_id, position: $position})
+    DETACH DELETE ev
+    """
+
+    SAVE_EVENTS = """
+    UNWIND range(0, size($events) - 1) AS index
+    WITH index, $events[index] AS event
+    CREATE (ev:StoryEvent {
+        outline_id: $outline_id, position: $position, index: index,
+        summary: event.summary, participants: event.participants
+    })
+    WITH ev, event
+    UNWIND event.participant_keys AS participant_key
+    MATCH (e:StoryEntity {outline_id: $outline_id, key: participant_key})
+    MERGE (e)-[:PARTICIPATED_IN]->(ev)
+    """
+
+    LOAD_ENTITIES = """
+    MATCH (e:StoryEntity {outline_id: $outline_id})
+    RETURN e.name AS name, e.kind AS kind, e.description AS description,
+           e.first_position AS first_position, e.last_position AS last_position
+    """
+
+    LOAD_EVENTS = """
+    MATCH (ev:StoryEvent {outline_id: $outline_id})
+    RETURN ev.summary AS summary, ev.participants AS participants, ev.position AS position
+    ORDER BY ev.position, ev.index
+    """
+
+    DELETE_FROM = """
+    MATCH (n {outline_id: $outline_id})
+    WHERE (n:StoryEvent AND n.position >= $position)
+       OR (n:StoryEntity AND n.first_position >= $position)
+    DETACH DELETE n
+    """
+
+    CLAMP_ENTITIES = """
+    MATCH (e:StoryEntity {outline_id: $outline_id})
+    WHERE e.last_position >= $position
+    SET e.last_position = $position - 1
+    """
+
+    def __init__(self, uri: str, username: str, password: str):
+        self._uri = uri
+        self._auth = (username, password)
+        self._driver = None
+        self._lock = threading.Lock()
+
+    def _get_driver(self):
+        with self._lock:
+            if self._driver is None:
+                from neo4j import GraphDatabase
+                self._driver = GraphDatabase.driver(self._uri, auth=self._auth)
+            return self._driver
+
+    def save_section(self, outline_id: str, position: int, state: SectionStoryState) -> None:
+        driver = self._get_driver()
+        entities = [{**entity.model_dump(), "key": _entity_key(entity.name)} for entity in state.entities]
+        events = [
+            {**event.model_dump(), "participant_keys": [_entity_key(name) for name in event.participants]}
+            for event in state.events
+        ]
+        driver.execute_query(self.SAVE_ENTITIES, outline_id=outline_id, position=position, entities=entities)
+        driver.execute_query(self.DELETE_SECTION_EVENTS, outline_id=outline_id, position=position)
+        driver.execute_query(self.SAVE_EVENTS, outline_id=outline_id, position=position, events=events)
+
+    def load(self, outline_id: str) -> OutlineStoryState:
+        driver = self._get_driver()
+        entity_records, _, _ = driver.execute_query(self.LOAD_ENTITIES, outline_id=outline_id)
+        event_records, _, _ = driver.execute_query(self.LOAD_EVENTS, outline_id=outline_id)
+
+        story = OutlineStoryState()
+        for record in entity_records:
+            entity = TrackedEntity(**record.data())
+            story.entities[_entity_key(entity.name)] = entity
+        story.events = [TrackedEvent(**record.data()) for record in event_records]
+        return story
+
+    def delete_from(self, outline_id: str, position: int) -> None:
+        driver = self._get_driver()
+        driver.execute_query(self.DELETE_FROM, outline_id=outline_id, position=position)
+        driver.execute_query(self.CLAMP_ENTITIES, outline_id=outline_id, position=position)
+
+
+class _PendingUpdate:
+    def __init__(self, position: int):
+        self.position = position
+        self.future: Optional[Future] = None
+        # Set by invalidate: the section was rewritten, so its extraction must not be applied
+        self.superseded = False
+
+
+class StoryStateService:
+    """
+    Tracks characters and events per outline and serves compact context for section prompts.
+
+    Each outline's state is cached in process. Sections are recorded in the background
+    after they are written and a context lookup reads straight from the cache, so it may
+    lag the latest section by one extraction. Set STORY_STATE_WAIT_SECONDS to let lookups
+    wait, up to that bound, for earlier sections that are still in flight.
+    """
+
+    def __init__(
+        self,
+        backend,
+        model: str = STORY_STATE_MODEL,
+        max_workers: int = 4,
+        cache_size: int = STORY_STATE_CACHE_SIZE,
+    ):
+        self._backend = backend
+        self._model = model
+        self._cache: "OrderedDict[str, OutlineStoryState]" = OrderedDict()
+        self._cache_size = cache_size
+        self._pending: Dict[str, List[_PendingUpdate]] = {}
+        self._lock = threading.Lock()
+        # Serializes saving an extraction with invalidate, so a truncated state is never written back
+        self._write_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="story-state")
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _get_state(self, outline_id: str) -> OutlineStoryState:
+        with self._lock:
+            state = self._cache.get(outline_id)
+            if state is not None:
+                self._cache.move_to_end(outline_id)
+                self.cache_hits += 1
+                return state
+
+        loaded = self._backend.load(outline_id)
+        with self._lock:
+            self.cache_misses += 1
+            state = self._cache.setdefault(outline_id, loaded)
+            self._cache.move_to_end(outline_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return state
+
+    def _wait_for_updates(self, outline_id: str, before_position: int, timeout: float) -> None:
+        with self._lock:
+            pending = self._pending.get(outline_id, [])
+            waiting = [
+                update.future for update in pending if update.position < before_position and not update.future.done()
+            ]
+        if waiting:
+            wait(waiting, timeout=timeout)
+
+    def get_context(self, outline_id: str, position: int, wait_seconds: float = STORY_STATE_WAIT_SECONDS) -> str:
+        """
+        Get a compact summary of the story before the section at `position`.
+
+        Args:
+            outline_id: The ID of the outline
+            position: Position of the section about to be written
+            wait_seconds: How long to wait for pending updates of earlier sections, 0 to not wait
+
+        Returns:
+            The summary text, empty if nothing has been recorded yet
+        """
+        if wait_seconds > 0:
+            self._wait_for_updates(outline_id, position, wait_seconds)
+        state = self._get_state(outline_id)
+        with self._lock:
+            return state.summary(position)
+
+    def record_section(self, outline_id: str, position: int, content: str) -> Future:
+        """
+        Extract entities and events from a written section and merge them in the background.
+
+        Args:
+            outline_id: The ID of the outline
+            position: Position of the written section
+            content: The generated section text
+
+        Returns:
+            A future that completes once the graph and cache are updated
+        """
+        update = _PendingUpdate(position)
+        with self._lock:
+            update.future = self._executor.submit(profiled(self._update_section), outline_id, update, content)
+            self._pending.setdefault(outline_id, []).append(update)
+        update.future.add_done_callback(lambda _: self._forget_pending(outline_id, update))
+        return update.future
+
+    def _forget_pending(self, outline_id: str, update: _PendingUpdate) -> None:
+        with self._lock:
+            pending = [other for other in self._pending.get(outline_id, []) if other is not update]
+            if pending:
+                self._pending[outline_id] = pending
+            else:
+                self._pending.pop(outline_id, None)
+
+    def invalidate(self, outline_id: str, from_position: int = 0) -> None:
+        """
+        Drop recorded state for sections at or after `from_position`.
+
+        Extractions of those sections still in flight are discarded when they finish.
+        """
+        with self._write_lock:
+            with self._lock:
+                for update in self._pending.get(outline_id, []):
+                    if update.position >= from_position:
+                        update.superseded = True
+            self._backend.delete_from(outline_id, from_position)
+            with self._lock:
+                state = self._cache.get(outline_id)
+                if state is not None:
+                    state.truncate(from_position)
+
+    def _update_section(self, outline_id: str, update: _PendingUpdate, content: str) -> None:
+        try:
+            state = self._get_state(outline_id)
+            with self._lock:
+                if update.superseded:
+                    return
+                known_entities = state.entity_names()
+            extracted = self._extract(content, known_entities)
+
+            with self._write_lock:
+                if update.superseded:
+                    logger.info(f"Discarding story state of rewritten section {update.position} of outline {outline_id}")
+                    return
+                self._backend.save_section(outline_id, update.position, extracted)
+                with self._lock:
+                    # The cached state may have been evicted and reloaded while extracting
+                    state = self._cache.get(outline_id)
+                    if state is not None:
+                        state.apply(update.position, extracted)
+        except Exception as e:
+            logger.error(f"Error updating story state for outline {outline_id}: {str(e)}")
+
+    def _extract(self, content: str, known_entities: List[str]) -> SectionStoryState:
+        prompt = prompt_template(
+            [
+                ("user", """
+                Extract the story state from the script section below.
+
+                - List the characters, places, objects and organizations that appear in it.
+                - Reuse these existing names exactly when they refer to the same entity: {known_entities}
+                - List the key events that happen, in order, with the names of the entities involved.
+                - Keep every description and event to one short sentence.
+
+                Section:
+                {content}
+                """),
+            ]
+        )
+
+        def build_chain(model_name: str):
+            return {
+                "content": lambda x: content,
+                "known_entities": lambda x: ", ".join(known_entities) or "none yet",
+            } | prompt | structured_model(model_name, SectionStoryState)
+
+        return get_model_router().invoke("story_state", self._model, build_chain)
+
+
+@lru_cache(maxsize=1)
+def get_story_state() -> Optional[StoryStateService]:
+    """
+    Return the shared story state service, or None when STORY_STATE_BACKEND is unset.
+
+    Raises:
+        ValueError: If STORY_STATE_BACKEND names an unknown backend
+    """
+    if not STORY_STATE_BACKEND:
+        return None
+    if STORY_STATE_BACKEND == "memory":
+        return StoryStateService(InMemoryStoryGraph())
+    if STORY_STATE_BACKEND == "neo4j":
+        return StoryStateService(Neo4jStoryGraph(
+            uri=os.getenv("NEO4J_URI"),
+            username=os.getenv("NEO4J_USERNAME"),
+            password=os.getenv("NEO4J_PASSWORD"),
+        ))
+    raise ValueError(f"Unknown STORY_STATE_BACKEND: {STORY_STATE_BACKEND}")
@@ -0,0 +1,111 @@
+import itertools
+import pytest
+from repository.content import ContentRepository
+from service import content
+
+
+class FakeRepository:
+    """In-memory stand-in for ContentRepository that records every write."""
+
+    def __init__(self):
+        self.outlines = {}
+        self.sections = {}
+        self.writes = []
+        self.section_rows = []
+        self._ids = itertools.count(1)
+
+    def add_outline(self, outline_id: str, sections: list, **outline) -> None:
+        self.outlines[outline_id] = {"id": outline_id, **outline}
+        for section in sections:
+            self.sections[section["id"]] = {"outline_id": outline_id, "chapter": None, "content": "", **section}
+
+    def create_outline(self, outline_data):
+        outline_id = f"o{next(self._ids)}"
+        self.writes.append(("create_outline", outline_id, outline_data))
+        self.outlines[outline_id] = {"id": outline_id, **outline_data}
+        return dict(self.outlines[outline_id])
+
+    def get_outline(self, outline_id, columns="*"):
+        if outline_id not in self.outlines:
+            raise ValueError(f"Outline with ID {outline_id} not found")
+        return dict(self.outlines[outline_id])
+
+    def update_outline(self, outline_id, outline_data):
+        self.writes.append(("update_outline", outline_id, outline_data))
+        self.outlines[outline_id].update(outline_data)
+        return dict(self.outlines[outline_id])
+
+    def get_outline_sections(self, outline_id, columns="*"):
+        rows = [dict(row) for row in self.sections.values() if row["outline_id"] == outline_id]
+        return sorted(rows, key=lambda row: row["position"])
+
+    def get_outline_section(self, section_id):
+        row = self.sections.get(section_id)
+        return dict(row) if row else None
+
+    def create_outline_sections(self, rows):
+        self.writes.extend(("create", row["position"]) for row in rows)
+        self.section_rows.extend(rows)
+        created = []
+        for row in rows:
+            stored = {"id": f"new-{next(self._ids)}", **row}
+            self.sections[stored["id"]] = stored
+            created.append(dict(stored))
+        return created
+
+    def upsert_outline_sections(self, rows):
+        self.writes.extend(("upsert", row["id"]) for row in rows)
+        self.section_rows.extend(rows)
+        for row in rows:
+            self.sections[row["id"]] = {**self.sections.get(row["id"], {}), **row}
+        return rows
+
+    def delete_outline_sections(self, ids):
+        self.writes.extend(("delete", section_id) for section_id in ids)
+        for section_id in ids:
+            del self.sections[section_id]
+
+    def update_section_content(self, section_id, content):
+        self.writes.append(("content", section_id))
+        self.sections[section_id]["content"] = content
+        return dict(self.sections[section_id])
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    fake = FakeRepository()
+    for name in (
+        "create_outline", "get_outline", "update_outline", "get_outline_sections", "get_outline_section",
+        "create_outline_sections", "upsert_outline_sections", "delete_outline_sections", "update_section_content",
+    ):
+        monkeypatch.setattr(ContentRepository, name, staticmethod(getattr(fake, name)))
+    return fake
+
+
+class RecordingStoryState:
+    """Story state stand-in that records invalidations and recorded sections."""
+
+    def __init__(self):
+        self.invalidated = []
+        self.recorded = []
+
+    def invalidate(self, outline_id, from_position=0):
+        self.invalidated.append((outline_id, from_position))
+
+    def record_section(self, outline_id, position, text):
+        self.recorded.append((outline_id, position))
+
+    def get_context(self, outline_id, position):
+        return ""
+
+
+@pytest.fixture(autouse=True)
+def no_story_state(monkeypatch):
+    monkeypatch.setattr(content, "get_story_state", lambda: None)
+
+
+@pytest.fixture
+def story_state(monkeypatch):
+    recorder = RecordingStoryState()
+    monkeypatch.setattr(content, "get_story_state", lambda: recorder)
+    return recorder
@@ -0,0 +1,99 @@
+import pytest
+from service import admission
+from service.admission import AdmissionController, AdmissionRejectedError
+from service.model_router import ModelRouter
+
+
+@pytest.fixture
+def router(monkeypatch):
+    router = ModelRouter()
+    monkeypatch.setattr(admission, "get_model_router", lambda: router)
+    monkeypatch.setattr(admission, "ADMISSION_CONTROL_ENABLED", True)
+    return router
+
+
+def _measure(router: ModelRouter, task: str, model: str, seconds: float) -> None:
+    router._model_stats(task, model).latencies.extend([seconds] * 5)
+
+
+def test_release_and_close_drain_the_queue(router):
+    controller = AdmissionController(slo_seconds=60, concurrency=1)
+    ticket = controller.admit("gpt", calls=3)
+    assert (controller.stats().queued_jobs, controller.stats().queued_sections) == (1, 3)
+
+    ticket.release()
+    stats = controller.stats()
+    assert (stats.queued_jobs, stats.queued_sections, stats.queued_tokens) == (1, 2, 2 * admission.EXPECTED_SECTION_TOKENS)
+
+    ticket.close()
+    stats = controller.stats()
+    assert (stats.queued_jobs, stats.queued_sections, stats.queued_tokens) == (0, 0, 0)
+    assert ticket.calls == 0
+
+
+def test_release_after_close_is_a_no_op(router):
+    controller = AdmissionController(slo_seconds=60, concurrency=1)
+    done = controller.admit("gpt", calls=2)
+    running = controller.admit("gpt", calls=2)
+
+    done.release(5)
+    done.close()
+    done.release()
+
+    stats = controller.stats()
+    assert (stats.queued_jobs, stats.queued_sections) == (1, 2)
+    running.close()
+
+
+def test_ticket_closes_on_error(router):
+    controller = AdmissionController(slo_seconds=60, concurrency=1)
+
+    with pytest.raises(RuntimeError):
+        with controller.admit("gpt", calls=4) as ticket:
+            ticket.release()
+            raise RuntimeError("generation failed")
+
+    stats = controller.stats()
+    assert (stats.queued_jobs, stats.queued_sections) == (0, 0)
+
+
+def test_sheds_when_backlog_exceeds_slo(router):
+    _measure(router, "section", "gpt", 10.0)
+    controller = AdmissionController(slo_seconds=30, concurrency=1)
+
+    controller.admit("gpt", calls=3)
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        controller.admit("gpt")
+
+    # 30s queued plus 10s for its own first call
+    assert rejected.value.retry_after == 10
+    assert (controller.admitted, controller.shed) == (1, 1)
+
+
+def test_first_job_is_always_admitted(router):
+    _measure(router, "section", "gpt", 10.0)
+    controller = AdmissionController(slo_seconds=30, concurrency=1)
+
+    controller.admit("gpt", calls=10)
+    assert controller.stats().queued_jobs == 1
+
+
+def test_backlog_uses_latency_of_matching_task(router):
+    _measure(router, "section", "gpt", 10.0)
+    _measure(router, "outline", "gpt", 2.0)
+    controller = AdmissionController(slo_seconds=30, concurrency=1)
+
+    controller.admit("gpt", calls=2)
+    controller.admit("gpt", calls=1, tokens_per_call=admission.EXPECTED_OUTLINE_TOKENS, task="outline")
+
+    assert controller.stats().estimated_backlog_seconds == pytest.approx(22.0)
+
+
+def test_disabled_admission_never_sheds(router, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_CONTROL_ENABLED", False)
+    _measure(router, "section", "gpt", 100.0)
+    controller = AdmissionController(slo_seconds=1, concurrency=1)
+
+    for _ in range(3):
+        controller.admit("gpt", calls=5)
+    assert controller.shed == 0
@@ -0,0 +1,37 @@
+from service.generation import OutlineGenerations
+
+
+def test_write_runs_while_generation_is_current():
+    generations = OutlineGenerations()
+    generation = generations.current("outline")
+    writes = []
+
+    assert generations.write_if_current("outline", generation, lambda: writes.append("a"))
+    assert writes == ["a"]
+
+
+def test_advance_drops_writes_of_earlier_jobs():
+    generations = OutlineGenerations()
+    job = generations.current("outline")
+    update = generations.advance("outline")
+    writes = []
+
+    assert not generations.write_if_current("outline", job, lambda: writes.append("stale"))
+    assert generations.write_if_current("outline", update, lambda: writes.append("fresh"))
+    assert writes == ["fresh"]
+
+
+def test_outlines_are_independent():
+    generations = OutlineGenerations()
+    job = generations.current("a")
+    generations.advance("b")
+
+    assert generations.current("a") == job
+
+
+def test_evicted_outline_does_not_revive_old_jobs():
+    generations = OutlineGenerations(max_outlines=1)
+    job = generations.current("a")
+    generations.current("b")
+
+    assert generations.current("a") != job
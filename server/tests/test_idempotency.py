@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from repository.content import ContentRepository
+from service.idempotency import IdempotencyConflictError, IdempotencyStore, get_idempotency_store
+
+
+def test_replay_returns_first_result():
+    store = IdempotencyStore()
+    calls = []
+
+    def operation():
+        calls.append(1)
+        return len(calls)
+
+    assert store.run("save:key", "a", operation) == 1
+    assert store.run("save:key", "a", operation) == 1
+    assert len(calls) == 1
+    assert store.replays == 1
+
+
+def test_concurrent_replay_waits_for_running_operation():
+    store = IdempotencyStore()
+    started = threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        time.sleep(0.1)
+        return "done"
+
+    first = threading.Thread(target=lambda: results.append(store.run("key", "a", slow)))
+    first.start()
+    started.wait()
+    results.append(store.run("key", "a", lambda: "rerun"))
+    first.join()
+
+    assert results == ["done", "done"]
+
+
+def test_different_request_under_same_key_conflicts():
+    store = IdempotencyStore()
+    store.run("save:key", "a", lambda: 1)
+
+    with pytest.raises(IdempotencyConflictError):
+        store.run("save:key", "b", lambda: 2)
+
+
+def test_mismatch_can_replace_entry():
+    store = IdempotencyStore()
+    store.run("completion:outline", "a", lambda: 1)
+
+    assert store.run("completion:outline", "b", lambda: 2, replace_on_mismatch=True) == 2
+    assert store.run("completion:outline", "b", lambda: 3) == 2
+
+
+def test_failed_operation_is_forgotten():
+    store = IdempotencyStore()
+
+    def failing():
+        raise RuntimeError("upstream error")
+
+    with pytest.raises(RuntimeError):
+        store.run("key", "a", failing)
+    assert store.run("key", "a", lambda: "retried") == "retried"
+
+
+def test_forget_keeps_entry_of_other_request():
+    store = IdempotencyStore()
+    store.run("completion:outline", "b", lambda: "newer")
+
+    store.forget("completion:outline", "a")
+    assert store.run("completion:outline", "b", lambda: "rerun") == "newer"
+
+    store.forget("completion:outline", "b")
+    assert store.run("completion:outline", "b", lambda: "rerun") == "rerun"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    created = []
+
+    def create_outline(outline_data):
+        created.append(outline_data)
+        return {"id": f"outline-{len(created)}", **outline_data}
+
+    monkeypatch.setattr(ContentRepository, "create_outline", staticmethod(create_outline))
+    monkeypatch.setattr(ContentRepository, "create_outline_sections", staticmethod(lambda sections: sections))
+    get_idempotency_store.cache_clear()
+
+    from main import app
+    yield TestClient(app), created
+    get_idempotency_store.cache_clear()
+
+
+def _outline(title: str) -> dict:
+    return {
+        "script_title": title,
+        "word_count": 1000,
+        "language": "English",
+        "audience": "Adults",
+        "style": "Narrative",
+        "tone": "Calm",
+        "model": "gpt-4o-mini",
+        "additional_data": "",
+        "speculate": False,
+        "sections": [{"position": 0, "title": "Intro", "description": "Opening", "instructions": ""}],
+    }
+
+
+def test_save_retry_replays_outline_id(client):
+    client, created = client
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/outline/save", json=_outline("Title"), headers=headers)
+    second = client.post("/outline/save", json=_outline("Title"), headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert first.json() == second.json() == {"outline_id": "outline-1"}
+    assert len(created) == 1
+
+
+def test_save_with_reused_key_and_different_body_is_409(client):
+    client, created = client
+    headers = {"Idempotency-Key": "retry-2"}
+
+    assert client.post("/outline/save", json=_outline("Title"), headers=headers).status_code == 201
+    response = client.post("/outline/save", json=_outline("Other title"), headers=headers)
+
+    assert response.status_code == 409
+    assert len(created) == 1
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from pydantic import BaseModel
+from service import model_router
+from service.model_router import ModelRouter
+
+
+class FakeChain:
+    """
+    Chain stand-in that answers after `delay` seconds, or raises `error`.
+
+    `delays` overrides the delay per call, e.g. a slow primary followed by a fast hedge.
+    """
+
+    def __init__(self, result=None, delay: float = 0.0, error: Exception = None, delays: list = None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.delays = list(delays or [])
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, _input):
+        self.calls += 1
+        delay = self.delays.pop(0) if self.delays else self.delay
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(model_router, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(model_router, "HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(model_router, "HEDGE_MAX_RATIO", 1.0)
+    monkeypatch.setattr(model_router, "MODEL_TIMEOUT_SECONDS", 5.0)
+    monkeypatch.setattr(model_router, "MODEL_FALLBACKS", {})
+    monkeypatch.setattr(model_router, "MODEL_DEFAULT_FALLBACK", "")
+    monkeypatch.setattr(model_router, "MODEL_POLICIES", {})
+    return ModelRouter()
+
+
+def test_hedge_wins_when_primary_is_slow(router):
+    chain = FakeChain("answer", delays=[2.0, 0.0])
+
+    assert router.invoke("section", "gpt", lambda model: chain) == "answer"
+    assert chain.calls == 2
+
+    stats = router._model_stats("section", "gpt")
+    assert (stats.calls, stats.hedges, stats.hedge_wins) == (1, 1, 1)
+    # The call is timed from the start of the race, including the wait before the hedge
+    assert len(stats.latencies) == 1 and stats.latencies[0] >= 0.05
+
+
+def test_hedged_primary_is_cancelled(router):
+    chain = FakeChain("answer", delays=[2.0, 0.0])
+
+    router.invoke("section", "gpt", lambda model: chain)
+
+    assert chain.cancelled == 1
+
+
+def test_no_hedge_when_primary_answers_in_time(router):
+    built = []
+
+    def build_chain(model):
+        built.append(model)
+        return FakeChain("primary")
+
+    assert router.invoke("section", "gpt", build_chain) == "primary"
+    assert built == ["gpt"]
+    assert router._model_stats("section", "gpt").hedges == 0
+
+
+def test_falls_back_when_primary_fails(router, monkeypatch):
+    monkeypatch.setattr(model_router, "MODEL_FALLBACKS", {"gpt": "mini"})
+
+    def build_chain(model):
+        if model == "gpt":
+            return FakeChain(error=RuntimeError("rate limited"))
+        return FakeChain(f"from {model}")
+
+    assert router.invoke("section", "gpt", build_chain) == "from mini"
+
+    primary = router._model_stats("section", "gpt")
+    assert (primary.errors, primary.fallbacks) == (1, 1)
+    assert router._model_stats("section", "mini").calls == 1
+
+
+def test_raises_last_error_when_fallback_fails_too(router, monkeypatch):
+    monkeypatch.setattr(model_router, "MODEL_FALLBACKS", {"gpt": "mini"})
+
+    def build_chain(model):
+        return FakeChain(error=RuntimeError(f"{model} down"))
+
+    with pytest.raises(RuntimeError, match="mini down"):
+        router.invoke("section", "gpt", build_chain)
+
+
+def test_timeout_is_counted_at_elapsed_time(router, monkeypatch):
+    monkeypatch.setattr(model_router, "HEDGING_ENABLED", False)
+    monkeypatch.setattr(model_router, "MODEL_TIMEOUT_SECONDS", 0.1)
+
+    with pytest.raises(TimeoutError):
+        router.invoke("section", "gpt", lambda model: FakeChain(delay=2.0))
+
+    stats = router._model_stats("section", "gpt")
+    assert stats.timeouts == 1
+    assert len(stats.latencies) == 1 and stats.latencies[0] >= 0.1
+
+
+def test_latency_is_tracked_per_task(router):
+    router.invoke("outline", "gpt", lambda model: FakeChain("outline"))
+
+    assert router.expected_latency("outline", "gpt") is not None
+    assert router.expected_latency("section", "gpt") is None
+
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI chat completions endpoint with keep-alive, so client connections are pooled."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps({"answer": "ok"})},
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Answer(BaseModel):
+    answer: str
+
+
+@pytest.fixture
+def openai_stub(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def _build_chain(model: str):
+    from service.llm import structured_model, prompt_template
+    return prompt_template([("user", "Say ok")]) | structured_model(model, Answer)
+
+
+def test_repeated_real_client_calls_share_one_loop(router, openai_stub):
+    for _ in range(5):
+        assert router.invoke("section", "gpt-4o-mini", _build_chain) == Answer(answer="ok")
+
+    assert router._model_stats("section", "gpt-4o-mini").errors == 0
+
+
+def test_concurrent_real_client_calls(router, openai_stub):
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda _: router.invoke("section", "gpt-4o-mini", _build_chain), range(20)))
+
+    assert results == [Answer(answer="ok")] * 20
+    assert router._model_stats("section", "gpt-4o-mini").errors == 0
@@ -0,0 +1,144 @@
+import pytest
+from models.content import GenerateOutlineSectionContentOutput, RegenerateSectionInput
+from service import content
+from service.admission import AdmissionController
+from service.content import ContentService
+
+
+@pytest.fixture
+def outline(repository):
+    repository.add_outline("o", [
+        {"id": f"s{position}", "position": position, "title": f"Title {position}",
+         "description": "", "instructions": "", "content": f"Old {position}"}
+        for position in range(4)
+    ], script_title="The Lighthouse", model="gpt-4o-mini")
+    return repository
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """Replaces the LLM call; `writer.texts` overrides the text written per section ID."""
+
+    class Writer:
+        def __init__(self):
+            self.texts = {}
+            self.inputs = []
+
+        def __call__(self, input, persist=True, generation=None):
+            self.inputs.append(input)
+            text = self.texts.get(input.section_id, f"New {input.current_section.position}")
+            ContentService.store_section_content(input, text, generation)
+            return GenerateOutlineSectionContentOutput(content=text)
+
+    fake = Writer()
+    monkeypatch.setattr(ContentService, "generate_outline_section_content", staticmethod(fake))
+    return fake
+
+
+def _regenerate(section_id, **options):
+    return ContentService.regenerate_section(
+        "o", section_id, RegenerateSectionInput(n_person_view="third", **options)
+    )
+
+
+def test_without_cascade_next_section_is_stale(outline, writer):
+    result = _regenerate("s1")
+
+    assert result.section.content == "New 1"
+    assert result.regenerated_section_ids == ["s1"]
+    assert result.stale_section_ids == ["s2"]
+    assert outline.sections["s2"]["content"] == "Old 2"
+
+
+def test_cascade_rewrites_following_sections(outline, writer):
+    result = _regenerate("s1", cascade=True)
+
+    assert result.regenerated_section_ids == ["s1", "s2", "s3"]
+    assert result.stale_section_ids == []
+    assert [outline.sections[f"s{i}"]["content"] for i in range(4)] == ["Old 0", "New 1", "New 2", "New 3"]
+
+
+def test_cascade_stops_at_max_cascade(outline, writer):
+    result = _regenerate("s0", cascade=True, max_cascade=1)
+
+    assert result.regenerated_section_ids == ["s0", "s1"]
+    assert result.stale_section_ids == ["s2"]
+
+
+def test_unchanged_window_stops_cascade(outline, writer):
+    writer.texts["s1"] = "Old 1"
+
+    result = _regenerate("s1", cascade=True)
+
+    assert result.regenerated_section_ids == ["s1"]
+    assert result.stale_section_ids == []
+
+
+def test_empty_next_section_stops_cascade(outline, writer):
+    outline.sections["s2"]["content"] = ""
+
+    result = _regenerate("s1", cascade=True)
+
+    assert result.regenerated_section_ids == ["s1"]
+    assert result.stale_section_ids == []
+
+
+def test_cascade_stays_within_chapter(outline, writer):
+    for section_id, chapter in (("s0", 0), ("s1", 0), ("s2", 1), ("s3", 1)):
+        outline.sections[section_id]["chapter"] = chapter
+
+    result = _regenerate("s1", cascade=True)
+
+    assert result.regenerated_section_ids == ["s1"]
+    assert result.stale_section_ids == []
+
+
+def test_previous_chapter_is_shared_as_outline_only(outline, writer):
+    for section_id, chapter in (("s0", 0), ("s1", 0), ("s2", 1), ("s3", 1)):
+        outline.sections[section_id]["chapter"] = chapter
+
+    _regenerate("s2")
+
+    previous = writer.inputs[0].previous_section
+    assert (previous.id, previous.title) == (None, "Title 1")
+
+
+def test_story_state_marks_all_later_sections_stale(outline, writer, story_state):
+    outline.sections["s3"]["content"] = ""
+
+    result = _regenerate("s0")
+
+    assert story_state.invalidated == [("o", 0)]
+    assert result.stale_section_ids == ["s1", "s2"]
+
+
+def test_story_state_stale_sections_follow_the_cascade(outline, writer, story_state):
+    result = _regenerate("s0", cascade=True, max_cascade=1)
+
+    assert result.regenerated_section_ids == ["s0", "s1"]
+    assert result.stale_section_ids == ["s2", "s3"]
+
+
+def test_admits_every_call_the_cascade_may_make(outline, writer, monkeypatch):
+    controller = AdmissionController()
+    admitted = []
+    admit = controller.admit
+
+    def recording_admit(model, calls=1, **kwargs):
+        admitted.append(calls)
+        return admit(model, calls, **kwargs)
+
+    monkeypatch.setattr(controller, "admit", recording_admit)
+    monkeypatch.setattr(content, "get_admission_controller", lambda: controller)
+
+    _regenerate("s1")
+    _regenerate("s1", cascade=True, max_cascade=1)
+    _regenerate("s1", cascade=True)
+
+    assert admitted == [1, 2, 3]
+    assert controller.stats().queued_sections == 0
+
+
+def test_unknown_section_raises(outline, writer):
+    with pytest.raises(ValueError):
+        _regenerate("missing")
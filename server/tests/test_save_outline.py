@@ -0,0 +1,57 @@
+from models.content import SaveOutlineInput
+from service.content import ContentService
+
+
+OUTLINE = {
+    "script_title": "The Lighthouse",
+    "word_count": 2000,
+    "language": "English",
+    "audience": "Adults",
+    "style": "Narrative",
+    "tone": "Calm",
+    "model": "gpt-4o-mini",
+    "additional_data": "",
+    "speculate": False,
+}
+
+
+def _section(position, chapter=None):
+    return {
+        "position": position,
+        "title": f"Title {position}",
+        "description": f"Description {position}",
+        "instructions": "",
+        "chapter": chapter,
+    }
+
+
+def _save(sections, **outline):
+    return ContentService.save_outline(SaveOutlineInput(**{**OUTLINE, **outline, "sections": sections}))
+
+
+def _stored_outline(repository, outline_id):
+    return next(data for write, written_id, data in repository.writes if write == "create_outline" and written_id == outline_id)
+
+
+def test_short_additional_data_does_not_write_index_column(repository):
+    outline_id = _save([_section(0)], additional_data="A few notes")
+
+    assert "additional_data_index" not in _stored_outline(repository, outline_id)
+
+
+def test_long_additional_data_writes_index(repository):
+    outline_id = _save([_section(0)], additional_data="word " * 1000)
+
+    assert _stored_outline(repository, outline_id)["additional_data_index"] is not None
+
+
+def test_flat_outline_does_not_write_chapter_column(repository):
+    _save([_section(0), _section(1)])
+
+    assert all("chapter" not in row for row in repository.section_rows)
+
+
+def test_hierarchical_outline_writes_chapters(repository):
+    _save([_section(0, chapter=0), _section(1, chapter=1)])
+
+    assert [row["chapter"] for row in repository.section_rows] == [0, 1]
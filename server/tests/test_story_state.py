@@ -0,0 +1,92 @@
+import threading
+import time
+import pytest
+from models.story_state import SectionStoryState, StoryEntity
+from service.story_state import InMemoryStoryGraph, StoryStateService
+
+
+@pytest.fixture
+def service():
+    """Story state service whose extraction names one entity per section and can be held back."""
+    service = StoryStateService(InMemoryStoryGraph(max_outlines=2), cache_size=2)
+    service.release = threading.Event()
+    service.release.set()
+    service.started = threading.Event()
+
+    def extract(content, known_entities):
+        service.started.set()
+        service.release.wait(5)
+        return SectionStoryState(entities=[StoryEntity(name=content, kind="character", description="")], events=[])
+
+    service._extract = extract
+    return service
+
+
+def _names(service, outline_id):
+    return sorted(service._get_state(outline_id).entity_names())
+
+
+def test_recorded_sections_reach_the_context(service):
+    service.record_section("o", 0, "Ada").result()
+    service.record_section("o", 1, "Grace").result()
+
+    assert "Ada" in service.get_context("o", 2)
+    assert "Grace" not in service.get_context("o", 1)
+
+
+def test_context_does_not_wait_for_pending_extraction(service):
+    service.record_section("o", 0, "Ada").result()
+    service.release.clear()
+    future = service.record_section("o", 1, "Grace")
+
+    assert "Grace" not in service.get_context("o", 2)
+
+    service.release.set()
+    future.result()
+    assert "Grace" in service.get_context("o", 2)
+
+
+def test_invalidate_discards_extraction_in_flight(service):
+    service.record_section("o", 0, "Ada").result()
+    service.release.clear()
+    service.started.clear()
+    future = service.record_section("o", 1, "Grace")
+    service.started.wait(5)
+
+    service.invalidate("o", from_position=1)
+    service.release.set()
+    future.result()
+
+    assert _names(service, "o") == ["Ada"]
+    assert service._backend.load("o").entity_names() == ["Ada"]
+
+
+def test_invalidate_keeps_extraction_of_earlier_section(service):
+    service.release.clear()
+    service.started.clear()
+    future = service.record_section("o", 0, "Ada")
+    service.started.wait(5)
+
+    service.invalidate("o", from_position=1)
+    service.release.set()
+    future.result()
+
+    assert _names(service, "o") == ["Ada"]
+
+
+def test_pending_entries_are_dropped_once_done(service):
+    service.record_section("o", 0, "Ada").result()
+
+    # The done callback may still be running right after result() returns
+    deadline = time.monotonic() + 1
+    while service._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service._pending == {}
+
+
+def test_caches_are_bounded(service):
+    for outline_id in ("a", "b", "c"):
+        service.record_section(outline_id, 0, outline_id).result()
+
+    assert list(service._cache) == ["b", "c"]
+    assert list(service._backend._sections) == ["b", "c"]
@@ -0,0 +1,200 @@
+import pytest
+from models.content import SaveOutlineInput
+from service.content import ContentService
+from service.generation import get_outline_generations
+
+
+OUTLINE = {
+    "script_title": "The Lighthouse",
+    "word_count": 2000,
+    "language": "English",
+    "audience": "Adults",
+    "style": "Narrative",
+    "tone": "Calm",
+    "model": "gpt-4o-mini",
+    "additional_data": "",
+}
+
+
+@pytest.fixture
+def outline(repository):
+    repository.add_outline("o", [
+        {"id": f"s{position}", "position": position, "title": f"Title {position}",
+         "description": f"Description {position}", "instructions": "", "content": f"Content {position}"}
+        for position in range(4)
+    ], **OUTLINE)
+    return repository
+
+
+def _section(position, id=None, title=None, chapter=None):
+    number = int(id[1:]) if id else position
+    return {
+        "id": id,
+        "position": position,
+        "title": title or f"Title {number}",
+        "description": f"Description {number}",
+        "instructions": "",
+        "chapter": chapter,
+    }
+
+
+def _update(sections, **outline):
+    return ContentService.update_outline("o", SaveOutlineInput(**{**OUTLINE, **outline, "sections": sections}))
+
+
+def _current_sections(sections):
+    return [_section(position, id=f"s{position}") for position in range(4)] if sections is None else sections
+
+
+def test_unchanged_outline_writes_nothing(outline):
+    generation = get_outline_generations().current("o")
+
+    response = _update(_current_sections(None))
+
+    assert response.rows_written == 0
+    assert outline.writes == []
+    assert get_outline_generations().current("o") == generation
+
+
+def test_sections_without_ids_match_by_position(outline):
+    response = _update([_section(position) for position in range(4)])
+
+    assert response.rows_written == 0
+    assert response.sections_created == []
+
+
+def test_brief_change_clears_content(outline):
+    sections = _current_sections(None)
+    sections[1] = _section(1, id="s1", title="New title")
+
+    response = _update(sections)
+
+    assert response.rows_written == 1
+    assert response.sections_updated == ["s1"]
+    assert response.sections_invalidated == ["s1"]
+    assert outline.sections["s1"]["content"] == ""
+    assert outline.sections["s2"]["content"] == "Content 2"
+
+
+def test_reorder_keeps_content(outline):
+    sections = [_section(0, id="s0"), _section(1, id="s2"), _section(2, id="s1"), _section(3, id="s3")]
+
+    response = _update(sections)
+
+    assert sorted(response.sections_updated) == ["s1", "s2"]
+    assert response.sections_invalidated == []
+    assert response.rows_written == 2
+    assert (outline.sections["s1"]["position"], outline.sections["s1"]["content"]) == (2, "Content 1")
+
+
+def test_id_match_wins_over_position(outline):
+    # s3 moves to position 0 by ID, so the section without an ID at position 3 is new and s0 goes
+    sections = [_section(0, id="s3"), _section(1, id="s1"), _section(2, id="s2"), _section(3, title="Fresh")]
+
+    response = _update(sections)
+
+    assert response.sections_updated == ["s3"]
+    assert response.sections_deleted == ["s0"]
+    assert len(response.sections_created) == 1
+    assert response.rows_written == 3
+    assert (outline.sections["s3"]["position"], outline.sections["s3"]["content"]) == (0, "Content 3")
+
+
+def test_section_without_id_reuses_row_at_its_position(outline):
+    sections = _current_sections(None)
+    sections[0] = _section(0, title="Fresh")
+
+    response = _update(sections)
+
+    assert response.sections_updated == ["s0"]
+    assert response.sections_invalidated == ["s0"]
+    assert response.sections_created == []
+
+
+def test_chapter_change_keeps_content(outline):
+    sections = _current_sections(None)
+    sections[2] = _section(2, id="s2", chapter=1)
+
+    response = _update(sections)
+
+    assert response.sections_updated == ["s2"]
+    assert response.sections_invalidated == []
+    assert outline.sections["s2"]["content"] == "Content 2"
+
+
+def test_insert_and_delete(outline):
+    sections = [_section(0, id="s0"), _section(1, id="s1"), _section(2, id="s2"), _section(4, title="Epilogue")]
+
+    response = _update(sections)
+
+    assert response.sections_deleted == ["s3"]
+    assert len(response.sections_created) == 1
+    assert response.sections_updated == []
+    assert response.rows_written == 2
+    assert sorted(row["position"] for row in outline.sections.values()) == [0, 1, 2, 4]
+
+
+def test_outline_parameters_are_written_once(outline):
+    response = _update(_current_sections(None), tone="Tense")
+
+    assert response.rows_written == 1
+    assert outline.writes == [("update_outline", "o", {"tone": "Tense"})]
+
+
+def test_section_changes_supersede_running_jobs(outline):
+    job = get_outline_generations().current("o")
+    sections = _current_sections(None)
+    sections[0] = _section(0, id="s0", title="New title")
+
+    _update(sections)
+
+    assert get_outline_generations().current("o") != job
+
+
+def test_story_state_is_invalidated_from_old_position_of_moved_section(outline, story_state):
+    # s1 moves from position 1 to 3, s3 is deleted and a new section takes position 1
+    sections = [_section(0, id="s0"), _section(1, title="Interlude"), _section(2, id="s2"), _section(3, id="s1")]
+
+    _update(sections)
+
+    assert story_state.invalidated == [("o", 1)]
+
+
+def test_story_state_is_untouched_without_section_changes(outline, story_state):
+
+    _update(_current_sections(None), tone="Tense")
+
+    assert story_state.invalidated == []
+
+
+def test_short_additional_data_does_not_write_index_column(outline):
+    _update(_current_sections(None), additional_data="A few notes")
+
+    assert outline.writes == [("update_outline", "o", {"additional_data": "A few notes"})]
+
+
+def test_long_additional_data_writes_index(outline):
+    _update(_current_sections(None), additional_data="word " * 1000)
+
+    (_, _, written), = outline.writes
+    assert written["additional_data_index"] is not None
+
+
+def test_rows_without_chapters_do_not_write_chapter_column(outline):
+    sections = [_section(0, id="s0", title="New title"), _section(1, id="s1"), _section(2, id="s2"), _section(3, id="s3"),
+                _section(4, title="Epilogue")]
+
+    _update(sections)
+
+    assert len(outline.section_rows) == 2
+    assert all("chapter" not in row for row in outline.section_rows)
+
+
+def test_chapter_is_written_on_every_row_once_any_section_has_one(outline):
+    sections = _current_sections(None)
+    sections[2] = _section(2, id="s2", chapter=1)
+    sections.append(_section(4, title="Epilogue"))
+
+    _update(sections)
+
+    assert [row["chapter"] for row in outline.section_rows] == [1, None]